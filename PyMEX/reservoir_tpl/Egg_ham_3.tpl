@@ -16,6 +16,9 @@ RESULTS SIMULATOR IMEX 201210
 ** ascii formatted output
 **FMTOUT   **This option specifies SI units for input data.
 
+** Restart keywords of the runs started from a shared prefix (PyMEX)
+**RESTART_INC
+
 **------------------------------------------------------------
 **DIM  *MAX_LAYERS  100
 
@@ -11,14 +11,18 @@
 # Created: Jul 2019
 # Author: Hygor Costa
 """
-import re
 import multiprocessing as mp
-from string import Template
-from os import remove, environ
-from subprocess import Popen, check_call
+import signal
+import time
+from os import remove, environ, killpg
+from subprocess import Popen, check_call, CalledProcessError, TimeoutExpired
 from pathlib import Path
 import numpy as np
 from .ImexTools import ImexTools
+from .template_cache import TEMPLATES
+from .rwo_reader import read_rwo, rwo_columns
+from .sr3_reader import Sr3Reader, sr3_available
+from .economics import BatchNPV
 
 
 def my_pid():
@@ -45,16 +49,63 @@ class PyMEX(ImexTools):
     def __init__(self, controls, *args):
         super().__init__(controls, *args)
         self.restore_file = False
+        self.restart = None
+        self.prefix_results = None
+        self.stop_time = None
+        self.scratch = None
         self.basename = self.cmgfile(create_name())
         self.time = np.array([])
         self.production = np.array([])
         self.wells_rate = np.array([])
         self.average_pressure = np.array([])
         self.npv = []
+        self.status = "ok"
+        self.timeout = self.res_param.get("sim_timeout")
+        self.retries = self.res_param.get("sim_retries", 0)
+        self.monitor_interval = self.res_param.get("monitor_interval", 30)
+        self.kill_threshold = None
+        self.early_bound = None
+        self.monitor_failed = False
+
+    def use_scratch(self, scratch):
+        """ Run in the directory of a worker, reused across runs.
+
+        Parameters
+        ----------
+        scratch: ScratchDir
+            Run directory of the worker.
+        """
+        self.scratch = scratch
+        self.run_path = scratch.path
+        self.basename = self.cmgfile("run")
+
+    def use_restart(self, irf_file, restart_time, prefix_results=None):
+        """ Start the run from the restart record of a prefix run.
+
+        Parameters
+        ----------
+        irf_file: str
+            Index file of the prefix run.
+        restart_time: int
+            Day of the restart record.
+        prefix_results: list
+            Time, production, wells rate and average pressure of the
+            prefix run, put before the results of the restarted run.
+        """
+        self.restart = (str(irf_file), int(restart_time))
+        self.prefix_results = prefix_results
+
+    def stop_at(self, stop_time):
+        """ Simulate only until stop_time and write a restart record."""
+        self.stop_time = int(stop_time)
 
     def include_operation(self):
-        """ Print operation of the wells."""
-        content_text = []
+        """ Print operation of the wells.
+
+        The schedule is built with one *TIME line for each 30 days
+        step and the *ALTER block replacing the steps where a control
+        cycle starts. The cycle times are computed only once.
+        """
         nb_prod = self.res_param["nb_prod"]
         nb_inj = self.res_param["nb_inj"]
 
@@ -68,36 +119,32 @@ class PyMEX(ImexTools):
             prod_values = map(str, np.round(well_prod, 4))
             return ' '.join(prod_values)
 
-        def write_alter(day, control, nb_prod, nb_inj):
+        div = '**' + '-' * 30
+        prod_name = alter_wells("PROD", nb_prod)
+        inj_name = alter_wells("INJECT", nb_inj)
+
+        def write_alter(day, control):
             """ Write the ALTER element."""
-            div = '**' + '-' * 30
             if day == 0:
                 time = '**TIME ' + str(day)
             else:
                 time = '*TIME ' + str(day)
-            prod_name = alter_wells("PROD", nb_prod)
             prod_rate = wells_rate(control[: nb_prod])
-            inj_name = alter_wells("INJECT", nb_inj)
             inj_rate = wells_rate(control[nb_prod:])
 
             lines = [div, time, div, prod_name, prod_rate,
                      div, inj_name, inj_rate, div, '\n']
             return '\n'.join(lines)
 
-        times = np.arange(0, self.res_param["time_concession"], 30)
-
-        count = 0
-        for time_step in times:
-            if time_step in self.time_steps():
-                control = self.modif_controls[count]
-                content_text += write_alter(time_step, control,
-                                            nb_prod, nb_inj)
-                count += 1
-            else:
-                time = '*TIME ' + str(time_step) + '\n'
-                content_text += time
-
-        return content_text
+        times = np.arange(0, self.stop_time or
+                          self.res_param["time_concession"], 30)
+        cycle_index = np.flatnonzero(np.isin(times, self.time_steps()))
+        times = times.tolist()
+        content_text = [f'*TIME {time_step}\n' for time_step in times]
+        for count, index in enumerate(cycle_index):
+            content_text[index] = write_alter(times[index],
+                                              self.modif_controls[count])
+        return ''.join(content_text)
 
     def create_well_operation(self):
         """Create a include file (.inc) to be incorporated to the .dat.
@@ -116,152 +163,328 @@ class PyMEX(ImexTools):
 
         # create *.dat from template
         tpl_name = self.file_to_open(self.res_param["template"])
-        with open(tpl_name, "r") as tpl_file, \
-                open(self.basename['dat'], "w") as dat:
-            template_content = tpl_file.read()
-
-            operation_content = ''.join(self.include_operation())
+        parts = TEMPLATES.data_template(tpl_name)
+        if self.stop_time is None:
             stop = [f'*TIME {time_conc}', "*STOP"]
-            operation_content += '\n'.join(stop)
-
-            template_content = re.sub(r"[\W][\W]WELL_INC",
-                                      operation_content, template_content)
-            dat.write(template_content)
+        else:
+            # prefix run, the restart record is written in the last time
+            stop = ['*WRST *TIME', f'*TIME {self.stop_time}', "*STOP"]
+        operation_content = self.include_operation() + '\n'.join(stop)
+        with open(self.basename['dat'], "w") as dat:
+            if self.restart is None:
+                dat.write(parts[0])
+            else:
+                head, tail = TEMPLATES.restart_template(tpl_name)
+                dat.writelines([head, self.restart_keywords(), tail])
+            for part in parts[1:]:
+                dat.writelines([operation_content, part])
+
+    def restart_keywords(self):
+        """ Input/output keywords to start from the restart record."""
+        irf_file, restart_time = self.restart
+        return (f"*FILENAMES *INDEX-IN '{irf_file}'\n"
+                f"*RESTART\n*RESTIME {restart_time}\n")
+
+    def supports_restart(self):
+        """ Verify if the data template has the RESTART_INC marker."""
+        tpl_name = self.file_to_open(self.res_param["template"])
+        return len(TEMPLATES.restart_template(tpl_name)) == 2
 
     def rwd_file(self):
         """create *.rwd (output conditions) from report.tmpl. """
         tpl_report = self.file_to_open("NewTemplateReport.tpl")
-        with open(tpl_report, "r") as tmpl, \
-                open(self.basename['rwd'], "w") as rwd:
-            tpl = Template(tmpl.read())
-            content = tpl.substitute(IRFFILE=self.basename['irf'])
-            rwd.write(content)
+        tpl = TEMPLATES.report_template(tpl_report)
+        with open(self.basename['rwd'], "w") as rwd:
+            rwd.write(tpl.substitute(IRFFILE=self.basename['irf']))
+
+    def read_report(self):
+        """ Read time, production, rates and pressure from the .rwo."""
+        try:
+            content_rwo = read_rwo(self.basename['rwo'])
+        except ValueError as err:
+            print("ValueError: Failed in Imex run.")
+            print(f"Verify {self.basename['log']}")
+            raise err
+        (self.time, self.production, self.wells_rate,
+         self.average_pressure) = rwo_columns(content_rwo)
+
+    def use_sr3(self):
+        """ Verify if the results are read from the .sr3 file."""
+        backend = self.res_param.get("results_backend", "report")
+        return backend == "sr3" and sr3_available()
+
+    def read_sr3(self):
+        """ Read time, production, rates and pressure from the .sr3."""
+        reader = Sr3Reader(self.basename['sr3'],
+                           self.res_param.get("sr3_columns"))
+        (self.time, self.production, self.wells_rate,
+         self.average_pressure) = rwo_columns(reader.read())
 
     def get_production(self, log, procedure):
         """ Get production for results."""
-        # columns in output spreadsheet (lexicographic order)
-        id_range = range(0, 10)
-        id_time = [0]  # 0 column
-        id_prod = range(1, 5)  # 1, 2 e 3 columns
-        id_rate = range(5, 9)  # 4, 5 e 6 columns
-        id_press = [9]  # 7 columns
         if procedure.returncode == 0:
+            if self.use_sr3():
+                try:
+                    self.read_sr3()
+                    self.stitch_prefix()
+                    return
+                except (OSError, KeyError, ValueError) as err:
+                    print(f"SR3 reader failed ({err}), using report.exe.")
             # get oil rate SC for all 20 producer wells
             imex_path = "/cmg/br/2018.10/linux_x64/exe/report.exe"
-            check_call([imex_path, "-f", self.basename['rwd'], "-o",
-                        self.basename['rwo']], stdout=log,
-                       cwd=str(self.run_path))
             try:
-                with open(self.basename['rwo']) as rwo:
-                    content_rwo = np.loadtxt(rwo, skiprows=6,
-                                             usecols=id_range)
-            except StopIteration as err:
-                print("StopIteration error: Failed in Imex run.")
-                print(f"Verify {self.basename['log']}")
-                raise err
-            self.time = content_rwo[:, id_time]
-            self.production = content_rwo[:, id_prod]
-            self.wells_rate = content_rwo[:, id_rate]
-            self.average_pressure = content_rwo[:, id_press]
+                check_call([imex_path, "-f", self.basename['rwd'], "-o",
+                            self.basename['rwo']], stdout=log,
+                           cwd=str(self.run_path))
+                self.read_report()
+                self.stitch_prefix()
+                return
+            except (OSError, CalledProcessError, ValueError) as err:
+                print(f"Results of {self.basename['dat']} not read: {err}")
+                self.status = "failed"
+        # IMEX has failed, nullify production
+        self.nullify_production()
+
+    def stitch_prefix(self):
+        """ Put the results of the prefix run before the restarted ones.
+
+        The output of a restarted run may begin only at *RESTIME, with
+        the cumulative volumes counted from day 0 or from the restart.
+        The prefix rows up to the first restarted time are added and,
+        when the volumes were counted from the restart, the prefix
+        volumes are added to them, so the npv is the one of the run
+        from day 0.
+        """
+        if self.restart is None or self.prefix_results is None:
+            return
+        prefix_time, prefix_prod, prefix_rate, prefix_pres = \
+            self.prefix_results
+        prefix_time = np.ravel(prefix_time)
+        first = np.ravel(self.time)[0]
+        before = prefix_time < first
+        if not before.any():
+            # the output already starts at day 0
+            return
+        at_restart = prefix_prod[prefix_time <= self.restart[1]][-1]
+        production = self.production
+        # cumulative volumes never decrease, unless counted again
+        if np.any(production[0] < at_restart - 1e-6 * np.abs(at_restart)):
+            production = production + at_restart
+        self.time = np.vstack((np.reshape(prefix_time[before], (-1, 1)),
+                               np.reshape(self.time, (-1, 1))))
+        self.production = np.vstack((prefix_prod[before], production))
+        self.wells_rate = np.vstack((prefix_rate[before], self.wells_rate))
+        self.average_pressure = np.vstack((
+            np.reshape(prefix_pres, (len(prefix_time), -1))[before],
+            np.reshape(self.average_pressure, (len(production), -1))))
+
+    def nullify_production(self):
+        """ Zero production for a failed run."""
+        # columns in output spreadsheet (lexicographic order)
+        id_prod = range(1, 5)  # 1, 2 e 3 columns
+        id_rate = range(5, 9)  # 4, 5 e 6 columns
+        time_steps = self.time_steps()
+        self.time = time_steps.reshape(-1, 1)
+        self.production = np.zeros([len(time_steps), len(id_prod)])
+        self.wells_rate = np.zeros([len(time_steps), len(id_rate)])
+        self.average_pressure = np.zeros([len(time_steps), 1])
+
+    def update_status(self, returncode, timed_out=False):
+        """ Status of the last attempt: ok, timeout or failed."""
+        if timed_out:
+            self.status = "timeout"
+        elif returncode != 0:
+            self.status = "failed"
         else:
-            # IMEX has failed, nullify production
-            self.production = np.zeros([len(self.time_steps),
-                                        len(id_prod)])
-            self.wells_rate = np.zeros([len(self.time_steps),
-                                        len(id_rate)])
-            self.average_pressure = np.zeros([len(self.time_steps), 1])
+            self.status = "ok"
+        return self.status == "ok"
+
+    @staticmethod
+    def kill(procedure):
+        """ Kill IMEX and the processes it started.
+
+        The run is started in a new session, so its process group
+        is the pid of the procedure.
+        """
+        try:
+            killpg(procedure.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def simulator_command(self):
+        """ Command line to run IMEX with the data file."""
+        dat_path = str(self.workdir.joinpath(self.basename['dat']))
+        return ['/cmg/RunSim.sh', 'imex', '2018.10', dat_path]
 
     def run_imex(self):
         """ call IMEX + Results Report. """
         # environ['CMG_HOME'] = '/cmg'
 
         with open(self.basename['log'], "w") as log:
-            dat_path = str(self.workdir.joinpath(self.basename['dat']))
-            path = ['/cmg/RunSim.sh', 'imex', '2018.10', dat_path]
-            procedure = Popen(path, stdout=log, cwd=str(self.run_path))
-            procedure.wait()
+            procedure = self.simulate(log)
             self.get_production(log, procedure)
 
+    def simulate(self, log):
+        """ Run IMEX and return the finished process.
+
+        Each attempt is killed after sim_timeout seconds and repeated
+        up to sim_retries times.
+        """
+        for _ in range(self.retries + 1):
+            procedure = Popen(self.simulator_command(), stdout=log,
+                              cwd=str(self.run_path),
+                              start_new_session=True)
+            try:
+                self.wait(procedure)
+                timed_out = False
+            except TimeoutExpired:
+                self.kill(procedure)
+                procedure.wait()
+                timed_out = True
+            if self.early_bound is not None:
+                self.status = "killed"
+                break
+            if self.update_status(procedure.returncode, timed_out):
+                break
+        return procedure
+
+    def wait(self, procedure):
+        """ Wait for IMEX, stopping it if the run is hopeless.
+
+        Without kill_threshold the run is only waited for. With it,
+        the partial production is checked every monitor_interval
+        seconds.
+
+        Raises
+        ------
+        TimeoutExpired after sim_timeout seconds.
+        """
+        if self.kill_threshold is None:
+            procedure.wait(timeout=self.timeout)
+            return
+        start = time.monotonic()
+        while True:
+            interval = self.monitor_interval
+            if self.timeout is not None:
+                left = self.timeout - (time.monotonic() - start)
+                if left <= 0:
+                    raise TimeoutExpired(procedure.args, self.timeout)
+                interval = min(interval, left)
+            try:
+                procedure.wait(timeout=interval)
+                return
+            except TimeoutExpired:
+                if self.hopeless():
+                    self.kill(procedure)
+                    procedure.wait()
+                    return
+
+    def partial_production(self):
+        """ Time and cumulative production of the running IMEX.
+
+        The .sr3 is read without the HDF5 file locking, IMEX has it
+        open for writing. The first failed read is reported, so a
+        monitor that can't read the run is visible.
+
+        Returns
+        -------
+        (time, production) read from the .sr3, None if it can't be
+        read yet.
+        """
+        if not sr3_available():
+            self.report_monitor("h5py is not installed")
+            return None
+        if not Path(self.basename['sr3']).is_file():
+            return None
+        try:
+            table = Sr3Reader(self.basename['sr3'],
+                              self.res_param.get("sr3_columns"),
+                              locking=False).read()
+        except (OSError, KeyError, ValueError, IndexError) as err:
+            # the file may be in the middle of a write
+            self.report_monitor(err)
+            return None
+        run_time, production, _, _ = rwo_columns(table)
+        return run_time.ravel(), production
+
+    def report_monitor(self, reason):
+        """ Report, only once, that the partial results were not
+        read."""
+        if not self.monitor_failed:
+            self.monitor_failed = True
+            print(f"Early kill: partial results of {self.basename['sr3']}"
+                  f" not read ({reason}).")
+
+    def hopeless(self):
+        """ Verify if the run can't be better than kill_threshold.
+
+        The npv so far plus the oil at the platform capacity until
+        the end of the concession is an optimistic bound of the npv,
+        it's kept in early_bound when the run is hopeless.
+        """
+        partial = self.partial_production()
+        if partial is None or len(partial[0]) < 2:
+            return False
+        run_time, production = partial
+        economics = BatchNPV(self.res_param["prices"])
+        bound = economics.bound(production[None], run_time,
+                                self.res_param["time_concession"],
+                                self.res_param["max_plat_prod"])[0, 0]
+        if bound > self.kill_threshold:
+            self.early_bound = bound
+            return True
+        return False
+
+    def run_prefix(self):
+        """ Run the shared prefix, keeping the restart files.
+
+        Returns
+        -------
+        True if the run has finished and its results were read.
+        """
+        self.prepare_run()
+        with open(self.basename['log'], "w") as log:
+            procedure = self.simulate(log)
+            if self.status == "ok":
+                # the members need the production before the restart
+                self.get_production(log, procedure)
+        return self.status == "ok"
+
     def restore_run(self):
         """ Restart the IMEX run."""
-        # columns in output spreadsheet (lexicographic order)
-        id_range = range(0, 10)
-        id_time = [0]  # 0 column
-        id_prod = range(1, 5)  # 1, 2 e 3 columns
-        id_rate = range(5, 9)  # 4, 5 e 6 columns
-        id_press = [9]  # 7 columns
         if self.restore_file:
-            content_rwo = np.loadtxt(
-                self.basename['rwo'], skiprows=6, usecols=id_range)
-            self.time = content_rwo[:, id_time]
-            self.production = content_rwo[:, id_prod]
-            self.wells_rate = content_rwo[:, id_rate]
-            self.average_pressure = content_rwo[:, id_press]
+            self.read_report()
         else:
             # IMEX has failed, nullify production
-            self.time = np.zeros([len(self.time_steps), len(id_time)])
-            self.production = np.zeros([len(self.time_steps),
-                                        len(id_prod)])
-            self.wells_rate = np.zeros([len(self.time_steps),
-                                        len(id_rate)])
-            self.average_pressure = np.zeros([len(self.time_steps), 1])
-
-    def _dif_production(self):
-        """ Calculate the increase amount by time step."""
-        dif_volume = []
-        for volume in self.production.T:
-            dif_volume.append(np.diff(volume))
-        return dif_volume
+            self.status = "failed"
+            self.nullify_production()
 
     def cash_flow(self):
         """ Return the cash flow from production."""
-        oil_price, water_prod_cost, water_inj_cost, _\
-            = self.res_param["prices"]
-
-        dif_volume = self._dif_production()
-        vol_oil_prod = dif_volume[0]
-        vol_water_prod = dif_volume[1]
-        vol_water_inj = dif_volume[3]
-
-        # Multiply by each price
-        revenue_oil = vol_oil_prod * oil_price
-        cost_water_prod = vol_water_prod * water_prod_cost
-        cost_water_inj = vol_water_inj * water_inj_cost
-
-        # Cash flow
-        cash_flows = revenue_oil - cost_water_prod - cost_water_inj
-
-        return np.insert(cash_flows, 0, 0)
+        economics = BatchNPV(self.res_param["prices"])
+        return economics.cash_flow(self.production[None])[0, 0]
 
     def net_present_value(self):
         """ Calculate the net present value of the \
             reservoir production"""
-        discount_rate = self.res_param["prices"][-1]
-
-        # Convert to periodic rate
-        periodic_rate = ((1 + discount_rate) ** (1 / 365)) - 1
-
-        # Create the cash flow (x 10^6) (Format of the numpy.npv())
-        cash_flows = self.cash_flow()
-
-        # Discount tax
-        tax = 1 / np.power((1 + periodic_rate), self.time)
-        npv_value = np.sum(np.multiply(cash_flows, tax.T))
-        self.npv = npv_value * (-1e-6)
+        if self.status == "killed":
+            # the run can't be better than its bound
+            self.npv = self.early_bound
+            return
+        if self.status != "ok":
+            self.npv = self.res_param.get("failure_penalty", 0.0)
+            return
+        economics = BatchNPV(self.res_param["prices"])
+        self.npv = economics.npv(self.production[None],
+                                 self.time.ravel())[0, 0]
 
     def call_pymex(self):
         """
         Run Imex.
         """
         if not self.restore_file:
-            # Verify if the Run_Path exist
-            Path(self.run_path).mkdir(parents=True, exist_ok=True)
-
-            # Write the well controls in data file
-            self.create_well_operation()
-
-            # Create .rwd file
-            self.rwd_file()
+            # Write the data and report files
+            self.prepare_run()
 
             # Run Imex + Results Report
             self.run_imex()
@@ -274,6 +497,31 @@ class PyMEX(ImexTools):
         else:
             self.restore_run()
 
+    def prepare_run(self):
+        """ Write the files needed before the IMEX run."""
+        # Verify if the Run_Path exist
+        Path(self.run_path).mkdir(parents=True, exist_ok=True)
+
+        # Write the well controls in data file
+        self.create_well_operation()
+
+        # Create .rwd file
+        self.rwd_file()
+
+    def finish_run(self, log, procedure):
+        """ Read the results of a finished IMEX run.
+
+        Parameters
+        ----------
+        log: file
+            Opened log file of the run.
+        procedure: Popen or asyncio.subprocess.Process
+            Finished IMEX process.
+        """
+        self.get_production(log, procedure)
+        self.net_present_value()
+        self.clean_up()
+
     @ property
     def report_resul(self):
         """ Return concatenate time, production, wells_rate,\
@@ -283,6 +531,9 @@ class PyMEX(ImexTools):
 
     def clean_up(self):
         """ Delet imex auxiliar files."""
+        if self.scratch is not None:
+            self.scratch.truncate(self.basename.values())
+            return
         for _, filename in self.basename.items():
             try:
                 remove(filename)
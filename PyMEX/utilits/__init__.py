@@ -14,3 +14,6 @@
 from .ManiParam import PyMEX
 from .ImexTools import ImexTools
 from .multi_process import ParallelPyMex
+from .async_engine import AsyncPyMex
+from .economics import BatchNPV
+from .proxy import TankProxy
@@ -0,0 +1,183 @@
+""" Asynchronous evaluation engine.
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+import numpy as np
+from .ManiParam import PyMEX
+from .scratch import ScratchDir
+
+
+class AsyncPyMex:
+
+    """Long-lived engine that keeps pool_size IMEX runs busy.
+
+    IMEX runs are started directly as subprocesses by an event loop
+    living in a background thread, so new controls can be submitted
+    while a batch is still running and there is no pool to start up
+    on every batch.
+    """
+
+    def __init__(self, res_param, pool_size=None):
+        """
+        Parameters
+        ----------
+        res_param: dictionary
+            Reservoir parameters
+        pool_size: int
+            Number of simultaneous IMEX runs, None is sequential.
+
+        """
+        self.res_param = res_param
+        self.pool_size = pool_size or 1
+        self.scratch = {slot: ScratchDir(res_param.get("scratch_root"),
+                                         res_param.get("use_tmpfs", False),
+                                         prefix=f"slot{slot}_")
+                        for slot in range(1, self.pool_size + 1)}
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.slots = self._call_soon(self._create_slots()).result()
+
+    def _call_soon(self, coroutine):
+        """ Schedule a coroutine in the engine loop."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def _create_slots(self):
+        """ Queue with the free simulation slots."""
+        slots = asyncio.Queue()
+        for slot in range(1, self.pool_size + 1):
+            slots.put_nowait(slot)
+        return slots
+
+    async def evaluate(self, control, slot, threshold=None):
+        """ Run one control in the given slot.
+
+        With threshold, the run is stopped when its optimistic npv
+        can't be better than it.
+
+        Returns
+        -------
+        npv and status of the run, a failed run has the penalty npv.
+        """
+        loop = asyncio.get_running_loop()
+        model = PyMEX(control, self.res_param)
+        model.use_scratch(self.scratch[slot])
+        model.kill_threshold = threshold
+        await loop.run_in_executor(None, model.prepare_run)
+        with open(model.basename['log'], "w") as log:
+            for _ in range(model.retries + 1):
+                procedure = await asyncio.create_subprocess_exec(
+                    *model.simulator_command(), stdout=log,
+                    cwd=str(model.run_path), start_new_session=True)
+                try:
+                    await asyncio.wait_for(self.wait(model, procedure),
+                                           model.timeout)
+                    timed_out = False
+                except asyncio.TimeoutError:
+                    model.kill(procedure)
+                    await procedure.wait()
+                    timed_out = True
+                if model.early_bound is not None:
+                    model.status = "killed"
+                    break
+                if model.update_status(procedure.returncode, timed_out):
+                    break
+            await loop.run_in_executor(None, model.finish_run, log,
+                                       procedure)
+        return model.npv, model.status
+
+    @staticmethod
+    async def wait(model, procedure):
+        """ Wait for the run, checking the partial production if the
+        model has a kill_threshold."""
+        if model.kill_threshold is None:
+            await procedure.wait()
+            return
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(asyncio.shield(procedure.wait()),
+                                       model.monitor_interval)
+                return
+            except asyncio.TimeoutError:
+                if await loop.run_in_executor(None, model.hopeless):
+                    model.kill(procedure)
+                    await procedure.wait()
+                    return
+
+    async def _run(self, control, threshold=None):
+        """ Wait for a free slot and evaluate the control."""
+        slot = await self.slots.get()
+        try:
+            return await self.evaluate(control, slot, threshold)
+        finally:
+            self.slots.put_nowait(slot)
+
+    def submit_run(self, control, threshold=None):
+        """ Submit one control.
+
+        Returns
+        -------
+        concurrent.futures.Future with the npv and status of the run.
+        """
+        return self._call_soon(self._run(control, threshold))
+
+    def submit(self, control):
+        """ Submit one control.
+
+        Returns
+        -------
+        concurrent.futures.Future with the npv of the control.
+        """
+        run = self.submit_run(control)
+        future = Future()
+
+        def set_npv(run):
+            if run.exception() is not None:
+                future.set_exception(run.exception())
+            else:
+                future.set_result(run.result()[0])
+
+        run.add_done_callback(set_npv)
+        return future
+
+    def submit_batch(self, controls):
+        """ Submit many controls, return one future per control."""
+        return [self.submit(control) for control in np.atleast_2d(controls)]
+
+    def run_batch(self, controls, threshold=None):
+        """ Evaluate the controls and wait for the npv and status."""
+        runs = [self.submit_run(control, threshold)
+                for control in np.atleast_2d(controls)]
+        npv, status = zip(*[run.result() for run in runs])
+        return np.array(npv), list(status)
+
+    def map(self, controls):
+        """ Evaluate the controls and wait for all the results."""
+        return self.run_batch(controls)[0]
+
+    def close(self):
+        """ Stop the event loop and remove the run directories."""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+        self.loop.close()
+        for scratch in self.scratch.values():
+            scratch.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
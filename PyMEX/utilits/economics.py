@@ -0,0 +1,142 @@
+""" Vectorized economics of the simulations.
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+from functools import lru_cache
+import numpy as np
+
+
+@lru_cache(maxsize=64)
+def _discount(time_key, shape, rates):
+    """ Discount factors for the time grid and the annual rates."""
+    time = np.frombuffer(time_key).reshape(shape)
+    # Convert to periodic rate
+    periodic_rate = np.power(1 + np.array(rates), 1 / 365) - 1
+    periodic_rate = periodic_rate.reshape((-1,) + (1,) * time.ndim)
+    factors = 1 / np.power(1 + periodic_rate, time)
+    factors.flags.writeable = False
+    return factors
+
+
+def discount_factors(time, rates):
+    """ Cached discount factors 1 / (1 + r)^t.
+
+    Parameters
+    ----------
+    time: array (num_times,) or (num_runs, num_times)
+        Days of each time step.
+    rates: array (num_scenarios,)
+        Annual discount rates.
+
+    Returns
+    -------
+    array (num_scenarios, *time.shape)
+    """
+    time = np.ascontiguousarray(time, dtype=float)
+    rates = tuple(float(rate) for rate in np.atleast_1d(rates))
+    return _discount(time.tobytes(), time.shape, rates)
+
+
+class BatchNPV:
+
+    """Cash flow and npv of many runs and price scenarios at once."""
+
+    def __init__(self, prices):
+        """
+        Parameters
+        ----------
+        prices: array (4,) or (num_scenarios, 4)
+            [oil price, water production cost, water injection cost,
+            annual discount rate] of each scenario.
+
+        """
+        self.prices = np.atleast_2d(np.asarray(prices, dtype=float))
+
+    def phase_prices(self):
+        """ Price of each production column for each scenario.
+
+        The columns are the cumulative oil, water and gas produced and
+        the cumulative water injected.
+        """
+        oil, water_prod, water_inj = self.prices[:, :3].T
+        zeros = np.zeros_like(oil)
+        return np.stack((oil, -water_prod, zeros, -water_inj), axis=1)
+
+    def cash_flow(self, production):
+        """ Cash flow of each time step.
+
+        Parameters
+        ----------
+        production: array (num_runs, num_times, num_phases)
+            Cumulative production of each run.
+
+        Returns
+        -------
+        array (num_scenarios, num_runs, num_times), zero in the first
+        time step.
+        """
+        production = np.asarray(production, dtype=float)
+        dif_volume = np.diff(production, axis=1, prepend=production[:, :1])
+        return np.einsum("rtp,sp->srt", dif_volume, self.phase_prices())
+
+    def npv(self, production, time):
+        """ Net present value (x -10^6) of each scenario and run.
+
+        Parameters
+        ----------
+        production: array (num_runs, num_times, num_phases)
+        time: array (num_times,) or (num_runs, num_times)
+
+        Returns
+        -------
+        array (num_scenarios, num_runs)
+        """
+        time = np.asarray(time, dtype=float)
+        factors = discount_factors(time, self.prices[:, -1])
+        if time.ndim == 1:
+            factors = factors[:, None, :]
+        cash_flows = self.cash_flow(production)
+        return np.sum(cash_flows * factors, axis=-1) * (-1e-6)
+
+    def bound(self, production, time, time_concession, max_oil_rate,
+              step=30):
+        """ Optimistic npv (x -10^6) of runs stopped at time[-1].
+
+        The cash flow so far plus the oil produced at max_oil_rate,
+        without water costs, in each report step until the end of the
+        concession. No run can have a better npv.
+
+        Parameters
+        ----------
+        production: array (num_runs, num_times, num_phases)
+            Cumulative production up to now.
+        time: array (num_times,)
+        time_concession: float
+            Last day of the production.
+        max_oil_rate: float
+            Platform oil capacity.
+        step: int
+            Days between the report times.
+
+        Returns
+        -------
+        array (num_scenarios, num_runs)
+        """
+        time = np.asarray(time, dtype=float)
+        so_far = self.npv(production, time)
+        grid = np.append(np.arange(0, time_concession, step),
+                         time_concession)
+        future = grid[grid > time[-1]]
+        if not len(future):
+            return so_far
+        delta = np.diff(future, prepend=time[-1])
+        factors = discount_factors(future, self.prices[:, -1])
+        remaining = factors.dot(delta) * max_oil_rate * self.prices[:, 0]
+        return so_far - remaining[:, None] * 1e-6
@@ -1,14 +1,18 @@
 """ Parallel computation. """
 import multiprocessing as mp
+from pathlib import Path
 import numpy as np
 from .ManiParam import PyMEX
+from .restart import prefix_groups
+from .scratch import ScratchDir, worker_scratch
 
 
 class ParallelPyMex:
 
     """Run imex in parallel for reservoir optimization."""
 
-    def __init__(self, controls, res_param, pool_size=None):
+    def __init__(self, controls, res_param, pool_size=None,
+                 threshold=None):
         """TODO: to be defined.
 
         Parameters
@@ -20,44 +24,127 @@ class ParallelPyMex:
         pool_size: int
             Pool size for multiprocessing, if pool_size is None
             so it's sequential.
+        threshold: float
+            Runs whose optimistic npv can't be better are stopped,
+            None runs all until the end.
 
         """
         self.controls = controls
         self.res_param = res_param
         self.pool_size = pool_size
+        self.threshold = threshold
+        self.status = []
 
     def run_sequential(self):
         """ Run PyMEX in a sequential way."""
-        npv = []
         if self.controls.ndim == 1:
-            model = PyMEX(self.controls, self.res_param)
-            model.call_pymex()
-            npv = model.npv
-        else:
-            for control in self.controls:
-                model = PyMEX(control, self.res_param)
-                model.call_pymex()
-                npv = np.append(npv, model.npv)
-        return npv
+            return [self.run_parallel(self.controls)]
+        return [self.run_parallel(control) for control in self.controls]
 
     def run_parallel(self, control):
-        """ Run PyMEX with Pool."""
+        """ Run PyMEX with Pool.
+
+        Returns
+        -------
+        npv and status of the run, a failed run has the penalty npv.
+        """
+        return self.run_task((control, None))
+
+    def run_task(self, task):
+        """ Run one control, from the restart of a prefix if given."""
+        control, restart = task
         model = PyMEX(control, self.res_param)
+        model.use_scratch(worker_scratch(self.res_param))
+        model.kill_threshold = self.threshold
+        if restart is not None:
+            model.use_restart(*restart)
         model.call_pymex()
-        return model.npv
+        return model.npv, model.status
+
+    def run_prefix(self, task):
+        """ Run the shared cycles of a group.
+
+        Returns
+        -------
+        (irf file, restart time, results of the prefix) or None if the
+        run has failed.
+        """
+        control, num_cycles, name, path = task
+        model = PyMEX(control, self.res_param)
+        model.run_path = Path(path)
+        model.basename = model.cmgfile(name)
+        model.stop_at(model.time_steps()[num_cycles])
+        if model.run_prefix():
+            return (model.basename['irf'], model.stop_time,
+                    model.report_resul)
+        print(f"Prefix run {name} has failed, running its group "
+              "from the start.")
+        return None
+
+    def use_prefix(self):
+        """ Verify if the shared prefixes are simulated only once."""
+        return bool(self.res_param.get("restart_prefix", False)) and \
+            self.controls.ndim != 1
+
+    def restarts(self, mapper, path):
+        """ Run the prefix of each group and return the restart of
+        each control, None for the ones run from the start."""
+        restarts = [None] * len(self.controls)
+        groups = prefix_groups(self.controls, self.res_param)
+        if not groups:
+            return restarts
+        if not PyMEX(self.controls[0], self.res_param).supports_restart():
+            print("The template has no RESTART_INC marker, "
+                  "restart_prefix is ignored.")
+            return restarts
+        tasks = [(self.controls[members[0]], num_cycles, f"prefix{index}",
+                  str(path))
+                 for index, (members, num_cycles) in enumerate(groups)]
+        for (members, _), restart in zip(groups,
+                                         mapper(self.run_prefix, tasks)):
+            for member in members:
+                restarts[member] = restart
+        return restarts
 
     def pool_pymex(self):
         """ Run imex in parallel.
 
+        With restart_prefix, the cycles shared by a group of controls
+        are simulated once and each control starts from their restart
+        record.
+
         Parameters
         ----------
         pool_size: int
             Number of process.
 
         """
-        if self.pool_size is not None and self.controls.ndim != 1:
-            with mp.Pool(self.pool_size) as proc:
-                npv = proc.map(self.run_parallel, self.controls)
+        if self.controls.ndim == 1:
+            runs = self.run_sequential()
         else:
-            npv = self.run_sequential()
+            proc, prefix_dir = None, None
+            mapper = map
+            if self.pool_size is not None:
+                # close + join lets the workers remove their directories
+                proc = mp.Pool(self.pool_size)
+                mapper = proc.map
+            try:
+                restarts = [None] * len(self.controls)
+                if self.use_prefix():
+                    prefix_dir = ScratchDir(
+                        self.res_param.get("scratch_root"),
+                        self.res_param.get("use_tmpfs", False),
+                        prefix="prefix")
+                    restarts = self.restarts(mapper, prefix_dir.path)
+                runs = list(mapper(self.run_task,
+                                   list(zip(self.controls, restarts))))
+            finally:
+                if proc is not None:
+                    proc.close()
+                    proc.join()
+                if prefix_dir is not None:
+                    prefix_dir.cleanup()
+        npv, self.status = map(list, zip(*runs))
+        if self.controls.ndim == 1:
+            return np.array(npv[0])
         return np.array(npv)
@@ -0,0 +1,128 @@
+""" Synthetic reservoir used in place of IMEX.
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+import numpy as np
+from .economics import BatchNPV
+
+PROXY_DEFAULTS = {"ooip": 1.0e6,  # m3 of oil in place
+                  "swi": 0.1,  # connate water saturation
+                  "sor": 0.2,  # residual oil saturation
+                  "mobility_ratio": 5.0,  # oil / water viscosity
+                  "storage": 200.0,  # m3 of voidage per bar
+                  "initial_pressure": 400.0,  # bar
+                  "min_pressure": 100.0,  # bar, producers stop
+                  "max_pressure": 500.0,  # bar, injectors stop
+                  "report_step": 30}  # days
+
+
+class TankProxy:
+
+    """Tank model of the reservoir, vectorized over many controls.
+
+    The reservoir is one tank with water flooding. The water cut
+    follows a Corey fractional flow of the average water saturation,
+    the pressure follows the voidage and the well rates fall linearly
+    as the pressure approaches the producer or injector limits. The
+    results have the same columns of the IMEX report, so the same
+    economics is used.
+    """
+
+    def __init__(self, res_param):
+        """
+        Parameters
+        ----------
+        res_param: dictionary
+            Reservoir parameters, the tank ones in res_param["proxy"].
+
+        """
+        self.res_param = res_param
+        self.param = dict(PROXY_DEFAULTS, **(res_param.get("proxy") or {}))
+
+    def schedule(self, controls):
+        """ Total producer and injector rates of each cycle.
+
+        Parameters
+        ----------
+        controls: array (num_runs, nb_cycles * (nb_prod + nb_inj))
+
+        Returns
+        -------
+        arrays (num_runs, nb_cycles) with the production and the
+        injection rates.
+        """
+        nb_prod = self.res_param["nb_prod"]
+        nb_inj = self.res_param["nb_inj"]
+        nb_cycles = self.res_param["nb_cycles"]
+        rates = np.reshape(controls, (len(controls), nb_cycles, -1))
+        prod = rates[..., :nb_prod].sum(axis=-1) * \
+            self.res_param["max_rate_prod"]
+        inj = rates[..., nb_prod:nb_prod + nb_inj].sum(axis=-1) * \
+            self.res_param["max_rate_inj"]
+        return prod, inj
+
+    def time_steps(self):
+        """ Report times, the same 30 days grid of the IMEX runs."""
+        time_conc = self.res_param["time_concession"]
+        step = self.param["report_step"]
+        return np.append(np.arange(0, time_conc, step), time_conc)
+
+    def simulate(self, controls):
+        """ Production of each control.
+
+        Returns
+        -------
+        time: array (num_times,)
+        production: array (num_runs, num_times, 4)
+            Cumulative oil, water and gas produced and water injected.
+        pressure: array (num_runs, num_times)
+        """
+        param = self.param
+        controls = np.atleast_2d(controls)
+        prod, inj = self.schedule(controls)
+        time = self.time_steps()
+        cycle_end = np.linspace(0, self.res_param["time_concession"],
+                                self.res_param["nb_cycles"] + 1)[1:]
+        # cycle of each report interval
+        cycle = np.searchsorted(cycle_end, time[1:], side="left")
+        pore_volume = param["ooip"] / (1 - param["swi"])
+        movable = pore_volume * (1 - param["swi"] - param["sor"])
+        p_init, p_min, p_max = (param["initial_pressure"],
+                                param["min_pressure"], param["max_pressure"])
+        num_runs = len(controls)
+        production = np.zeros((num_runs, len(time), 4))
+        pressure = np.full((num_runs, len(time)), p_init)
+        water = np.full(num_runs, pore_volume * param["swi"])
+        for step, (delta, index) in enumerate(zip(np.diff(time), cycle), 1):
+            last = pressure[:, step - 1]
+            q_liq = prod[:, index] * np.clip(
+                (last - p_min) / (p_init - p_min), 0, 1)
+            q_inj = inj[:, index] * np.clip(
+                (p_max - last) / (p_max - p_init), 0, 1)
+            norm_sw = np.clip((water / pore_volume - param["swi"]) /
+                              (1 - param["swi"] - param["sor"]), 0, 1)
+            krw = norm_sw ** 2
+            kro = (1 - norm_sw) ** 2 / param["mobility_ratio"]
+            water_cut = krw / (krw + kro)
+            oil = np.minimum(q_liq * (1 - water_cut) * delta,
+                             movable - production[:, step - 1, 0])
+            wat = q_liq * delta - oil
+            water += q_inj * delta - wat
+            pressure[:, step] = last + (q_inj * delta - oil - wat) / \
+                param["storage"]
+            production[:, step] = production[:, step - 1] + \
+                np.stack((oil, wat, np.zeros(num_runs), q_inj * delta), 1)
+        return time, production, pressure
+
+    def npv(self, controls):
+        """ Net present value (x -10^6) of each control."""
+        time, production, _ = self.simulate(controls)
+        economics = BatchNPV(self.res_param["prices"])
+        return economics.npv(production, time)[0]
@@ -0,0 +1,62 @@
+""" Candidates that share the first control cycles.
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+import numpy as np
+
+
+def cycle_rates(controls, res_param):
+    """ Well rates of each cycle as written in the schedule.
+
+    Returns
+    -------
+    array (num_controls, nb_cycles, nb_prod + nb_inj)
+    """
+    nb_prod = res_param["nb_prod"]
+    nb_inj = res_param["nb_inj"]
+    rate_max = np.repeat([res_param["max_rate_prod"],
+                          res_param["max_rate_inj"]], [nb_prod, nb_inj])
+    rates = np.reshape(controls, (len(controls), res_param["nb_cycles"],
+                                  nb_prod + nb_inj))
+    # the schedule has 4 decimals
+    return np.round(rates * rate_max, 4)
+
+
+def prefix_groups(controls, res_param, min_size=2):
+    """ Group the controls with the same first cycles.
+
+    The controls are grouped by the first cycle and each group shares
+    the leading cycles that are equal for all its members, never the
+    last one. Only problems with fixed cycle times are grouped.
+
+    Returns
+    -------
+    list of (members, num_cycles): indexes of the controls and the
+    number of shared cycles.
+    """
+    nb_cycles = res_param["nb_cycles"]
+    controls = np.atleast_2d(controls)
+    if res_param["type_time"] != 0 or nb_cycles < 2 or \
+            len(controls) < min_size:
+        return []
+    rates = cycle_rates(controls, res_param)
+    _, labels = np.unique(rates[:, 0], axis=0, return_inverse=True)
+    labels = labels.ravel()
+    groups = []
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        if len(members) < min_size:
+            continue
+        shared = 1
+        while shared < nb_cycles - 1 and \
+                np.all(rates[members, shared] == rates[members[0], shared]):
+            shared += 1
+        groups.append((members, shared))
+    return groups
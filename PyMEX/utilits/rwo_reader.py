@@ -0,0 +1,51 @@
+""" Reader of the report.exe spreadsheet (.rwo).
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+from collections import namedtuple
+import numpy as np
+
+RwoColumns = namedtuple("RwoColumns",
+                        "time production wells_rate average_pressure")
+
+
+def read_rwo(path, skiprows=6, num_cols=10):
+    """ Read the numeric table of a .rwo file in one pass.
+
+    np.loadtxt has a C tokenizer since numpy 1.23 and, restricted to
+    the used columns, it is faster than parsing the whole buffer with
+    np.fromstring or pandas.
+
+    Parameters
+    ----------
+    path: str
+        Name of the .rwo file.
+    skiprows: int
+        Number of header lines.
+    num_cols: int
+        Number of columns kept.
+
+    Returns
+    -------
+    array (num_times, num_cols) in Fortran order, so each column is
+    contiguous in memory.
+    """
+    table = np.loadtxt(path, skiprows=skiprows, usecols=range(num_cols),
+                       ndmin=2)
+    if not table.size:
+        raise ValueError(f"{path} has no data.")
+    return np.asfortranarray(table)
+
+
+def rwo_columns(table):
+    """ Views of the report columns: time, cumulative production,
+    rates and average pressure."""
+    return RwoColumns(table[:, 0:1], table[:, 1:5], table[:, 5:9],
+                      table[:, 9:10])
@@ -0,0 +1,73 @@
+""" Run directories of the simulation workers.
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+import os
+import shutil
+import tempfile
+from multiprocessing import util
+from pathlib import Path
+
+
+class ScratchDir:
+
+    """Unique run directory of one worker, reused across runs.
+
+    The files of a run are truncated instead of deleted and the
+    directory is removed once, when the worker finishes.
+    """
+
+    def __init__(self, root=None, use_tmpfs=False, prefix="worker"):
+        """
+        Parameters
+        ----------
+        root: str
+            Folder where the directory is created, default Temp_Run.
+        use_tmpfs: bool
+            Create the directory in /dev/shm, if it exists.
+        prefix: str
+            Prefix of the directory name.
+
+        """
+        if use_tmpfs and os.path.isdir("/dev/shm"):
+            root = "/dev/shm"
+        elif root is None:
+            root = Path.cwd() / "Temp_Run"
+        Path(root).mkdir(parents=True, exist_ok=True)
+        self.path = Path(tempfile.mkdtemp(prefix=f"{prefix}{os.getpid()}_",
+                                          dir=root))
+        self._finalizer = util.Finalize(self, shutil.rmtree,
+                                        args=(self.path, True),
+                                        exitpriority=0)
+
+    @staticmethod
+    def truncate(filenames):
+        """ Empty the files of a run, keeping the directory entries."""
+        for filename in filenames:
+            try:
+                os.truncate(filename, 0)
+            except FileNotFoundError:
+                pass
+
+    def cleanup(self):
+        """ Remove the directory and all its files."""
+        self._finalizer()
+
+
+_WORKER_SCRATCH = {}
+
+
+def worker_scratch(res_param):
+    """ Scratch directory of the current process, created once."""
+    pid = os.getpid()
+    if pid not in _WORKER_SCRATCH:
+        _WORKER_SCRATCH[pid] = ScratchDir(res_param.get("scratch_root"),
+                                          res_param.get("use_tmpfs", False))
+    return _WORKER_SCRATCH[pid]
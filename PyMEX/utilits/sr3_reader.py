@@ -0,0 +1,116 @@
+""" Reader of the IMEX results file (.sr3).
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+import numpy as np
+
+try:
+    import h5py
+except ImportError:  # report.exe is used instead
+    h5py = None
+
+# Same columns of NewTemplateReport.tpl after the time:
+# (table, origin, variable)
+SR3_COLUMNS = [
+    ("GROUPS", "FIELD-PRO", "OILVOLSC"),
+    ("GROUPS", "FIELD-PRO", "WATVOLSC"),
+    ("GROUPS", "FIELD-PRO", "GASVOLSC"),
+    ("GROUPS", "FIELD-INJ", "WATVOLSC"),
+    ("GROUPS", "FIELD-PRO", "OILRATSC"),
+    ("GROUPS", "FIELD-PRO", "WATRATSC"),
+    ("GROUPS", "FIELD-PRO", "LIQRATSC"),
+    ("GROUPS", "FIELD-INJ", "LIQRATSC"),
+    ("SECTORS", "FIELD", "PAVG"),
+]
+
+
+def sr3_available():
+    """ Verify if h5py is installed."""
+    return h5py is not None
+
+
+def _decode(names):
+    """ Names stored as bytes in the SR3 file."""
+    return [name.decode().strip() if isinstance(name, bytes)
+            else str(name).strip() for name in names]
+
+
+class Sr3Reader:
+
+    """Read time series straight from the HDF5 results of IMEX.
+
+    The file is opened only when read and only the hyperslabs of
+    the requested columns are loaded.
+    """
+
+    def __init__(self, path, columns=None, locking=True):
+        """
+        Parameters
+        ----------
+        path: str
+            Name of the .sr3 file.
+        columns: list of (table, origin, variable)
+            Columns to read, default is SR3_COLUMNS.
+        locking: bool
+            Use the HDF5 file locking. The file of a running IMEX is
+            open for writing and can only be read without it.
+
+        """
+        if h5py is None:
+            raise ImportError("h5py is needed to read the .sr3 file.")
+        self.path = path
+        self.columns = SR3_COLUMNS if columns is None else columns
+        self.options = {} if locking else {"locking": False}
+
+    @staticmethod
+    def table_days(sr3, table):
+        """ Days of each time step of a time series table."""
+        master = sr3["General/MasterTimeTable"]
+        days = master["Offset in days"]
+        steps = sr3[f"TimeSeries/{table}/Timesteps"][:]
+        index = np.searchsorted(master["Index"], steps)
+        return days[index]
+
+    @staticmethod
+    def column(sr3, table, origin, variable):
+        """ Values of one variable for one origin."""
+        series = sr3[f"TimeSeries/{table}"]
+        id_origin = _decode(series["Origins"][:]).index(origin)
+        id_var = _decode(series["Variables"][:]).index(variable)
+        return series["Data"][:, id_var, id_origin]
+
+    def read(self):
+        """ Read the time and the columns.
+
+        Columns stored with other time steps are interpolated in the
+        time of the first table.
+
+        Returns
+        -------
+        array (num_times, 1 + num_columns) in Fortran order, the same
+        layout of read_rwo.
+        """
+        with h5py.File(self.path, "r", **self.options) as sr3:
+            days = {}
+            for table, _, _ in self.columns:
+                if table not in days:
+                    days[table] = self.table_days(sr3, table)
+            time = days[self.columns[0][0]]
+            table_out = np.empty((len(time), len(self.columns) + 1),
+                                 order="F")
+            table_out[:, 0] = time
+            for index, (table, origin, variable) in \
+                    enumerate(self.columns, start=1):
+                values = self.column(sr3, table, origin, variable)
+                if len(days[table]) != len(time) or \
+                        not np.array_equal(days[table], time):
+                    values = np.interp(time, days[table], values)
+                table_out[:, index] = values
+        return table_out
@@ -0,0 +1,67 @@
+""" Per-process cache of the IMEX templates.
+# -*- coding: utf8 -*-
+# Copyright (c) 2019 Hygor Costa
+#
+# This file is part of Py_IMEX.
+#
+# You should have received a copy of the GNU General Public License
+# along with HUM.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Author: Hygor Costa
+"""
+import os
+import re
+from string import Template
+
+
+class TemplateCache:
+
+    """Templates read and parsed once, invalidated by the file mtime."""
+
+    well_inc = re.compile(r"[\W][\W]WELL_INC")
+    restart_inc = re.compile(r"[\W][\W]RESTART_INC")
+
+    def __init__(self):
+        self.entries = {}
+
+    def load(self, path, parse):
+        """ Return parse(content of path), reading it only if changed."""
+        key = (str(path), parse)
+        mtime = os.stat(path).st_mtime_ns
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != mtime:
+            with open(path, "r") as file:
+                entry = (mtime, parse(file.read()))
+            self.entries[key] = entry
+        return entry[1]
+
+    def data_template(self, path):
+        """ Data template split at the WELL_INC markers.
+
+        Returns
+        -------
+        list of str: the well schedule is written between each part.
+        """
+        return self.load(path, self.well_inc.split)
+
+    def restart_template(self, path):
+        """ Head of the data template split at the RESTART_INC marker.
+
+        Returns
+        -------
+        list of str: two parts if the template has the marker, the
+        restart keywords are written between them.
+        """
+        return self.load(path, self.split_restart)
+
+    def split_restart(self, content):
+        """ Split the part before the schedule at RESTART_INC."""
+        head = self.well_inc.split(content, maxsplit=1)[0]
+        return self.restart_inc.split(head, maxsplit=1)
+
+    def report_template(self, path):
+        """ Report template ready for substitution."""
+        return self.load(path, Template)
+
+
+TEMPLATES = TemplateCache()
@@ -0,0 +1 @@
+""" Benchmarks for the SAO framework and PyMEX."""
@@ -0,0 +1,93 @@
+""" Benchmark of the well schedule written in the .dat file.
+
+Compares PyMEX.include_operation with the former loop, which called
+time_steps() and tested the membership of every 30 days step.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_include_operation
+"""
+import time
+import argparse
+import numpy as np
+from PyMEX.utilits import PyMEX
+
+
+def legacy_include_operation(model):
+    """ Former implementation of PyMEX.include_operation."""
+    content_text = []
+    nb_prod = model.res_param["nb_prod"]
+    nb_inj = model.res_param["nb_inj"]
+
+    def alter_wells(well_type, number):
+        wells_name = [f"'{well_type}{i + 1}'" for i in range(number)]
+        return ' '.join(['*ALTER'] + wells_name)
+
+    def wells_rate(well_prod):
+        return ' '.join(map(str, np.round(well_prod, 4)))
+
+    def write_alter(day, control):
+        div = '**' + '-' * 30
+        if day == 0:
+            time_line = '**TIME ' + str(day)
+        else:
+            time_line = '*TIME ' + str(day)
+        lines = [div, time_line, div, alter_wells("PROD", nb_prod),
+                 wells_rate(control[: nb_prod]), div,
+                 alter_wells("INJECT", nb_inj),
+                 wells_rate(control[nb_prod:]), div, '\n']
+        return '\n'.join(lines)
+
+    count = 0
+    for time_step in np.arange(0, model.res_param["time_concession"], 30):
+        if time_step in model.time_steps():
+            content_text += write_alter(time_step,
+                                        model.modif_controls[count])
+            count += 1
+        else:
+            content_text += '*TIME ' + str(time_step) + '\n'
+    return ''.join(content_text)
+
+
+def create_model(nb_prod, nb_inj, nb_cycles, time_concession):
+    """ PyMEX instance with random controls."""
+    res_param = {"path": ".", "nb_prod": nb_prod, "nb_inj": nb_inj,
+                 "nb_cycles": nb_cycles, "max_rate_prod": 120,
+                 "max_rate_inj": 79.5, "time_concession": time_concession,
+                 "type_time": 0}
+    controls = np.random.uniform(0, 1, nb_cycles * (nb_prod + nb_inj))
+    return PyMEX(controls, res_param)
+
+
+def best_time(func, model, repeat):
+    """ Best time of repeat calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(model)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """ Time both implementations."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    cases = [(4, 8, 3, 3600), (4, 8, 10, 7200), (40, 48, 10, 18000),
+             (40, 48, 20, 36000)]
+
+    print(f"{'wells':>6} {'cycles':>7} {'days':>6} {'legacy [ms]':>12}"
+          f" {'new [ms]':>9} {'speedup':>8}")
+    for nb_prod, nb_inj, nb_cycles, days in cases:
+        model = create_model(nb_prod, nb_inj, nb_cycles, days)
+        assert legacy_include_operation(model) == model.include_operation()
+        legacy = best_time(legacy_include_operation, model, args.repeat)
+        new = best_time(PyMEX.include_operation, model, args.repeat)
+        print(f"{nb_prod + nb_inj:>6} {nb_cycles:>7} {days:>6}"
+              f" {1e3 * legacy:>12.2f} {1e3 * new:>9.2f}"
+              f" {legacy / new:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+""" Benchmark of the RbfPoly fitting: pinv x SaddlePointSolver.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rbf_solver --sizes 250 500 1000 2000 4000
+"""
+import time
+import argparse
+import numpy as np
+from scipy.spatial import distance
+from sao_opt.saddle_point import SaddlePointSolver
+
+
+def rbf_system(num_samples, dim, rng):
+    """ Cubic kernel, linear tail and rhs for random samples."""
+    samples = rng.uniform(0, 1, (num_samples, dim))
+    values = np.sum(samples ** 2, axis=1) + np.sin(5 * samples[:, 0])
+    phi = np.power(distance.cdist(samples, samples), 3)
+    p_matrix = np.hstack((samples, np.ones((num_samples, 1))))
+    rhs = np.hstack((values, np.zeros(dim + 1)))
+    return phi, p_matrix, rhs
+
+
+def fit_pinv(phi, p_matrix, rhs):
+    """ Current path: dense matrix and pseudo inverse."""
+    zeros = np.zeros((p_matrix.shape[1], p_matrix.shape[1]))
+    matrix = np.block([[phi, p_matrix], [p_matrix.T, zeros]])
+    return np.linalg.pinv(matrix).dot(rhs)
+
+
+def fit_saddle(phi, p_matrix, rhs):
+    """ Null-space solver."""
+    return SaddlePointSolver(phi, p_matrix).solve(rhs)
+
+
+def residual(phi, p_matrix, rhs, params):
+    """ Relative residual of the augmented system."""
+    num_samples = len(phi)
+    lamb, gamma = params[:num_samples], params[num_samples:]
+    res = np.hstack((phi.dot(lamb) + p_matrix.dot(gamma) -
+                     rhs[:num_samples], p_matrix.T.dot(lamb)))
+    return np.linalg.norm(res) / np.linalg.norm(rhs)
+
+
+def main():
+    """ Time both solvers for each size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[250, 500, 1000, 2000])
+    parser.add_argument("--dim", type=int, default=36)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'n':>6} {'pinv [s]':>10} {'saddle [s]':>11} {'speedup':>8}"
+          f" {'res pinv':>10} {'res saddle':>11}")
+    for num_samples in args.sizes:
+        system = rbf_system(num_samples, args.dim, rng)
+        start = time.perf_counter()
+        params_pinv = fit_pinv(*system)
+        time_pinv = time.perf_counter() - start
+        start = time.perf_counter()
+        params_saddle = fit_saddle(*system)
+        time_saddle = time.perf_counter() - start
+        print(f"{num_samples:>6} {time_pinv:>10.3f} {time_saddle:>11.3f}"
+              f" {time_pinv / time_saddle:>8.1f}"
+              f" {residual(*system, params_pinv):>10.2e}"
+              f" {residual(*system, params_saddle):>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
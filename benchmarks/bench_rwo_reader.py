@@ -0,0 +1,90 @@
+""" Benchmark of the .rwo reader against the former parsing.
+
+The former code parsed with np.loadtxt and copied four column groups
+with fancy indexing; read_rwo parses once and returns views. The
+parsing of the whole buffer with np.fromstring, without np.loadtxt, is
+timed too: it is the reason read_rwo keeps np.loadtxt.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rwo_reader
+"""
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import numpy as np
+from PyMEX.utilits.rwo_reader import read_rwo, rwo_columns
+
+
+def write_rwo(path, num_times, num_cols, rng):
+    """ Synthetic report with 6 header lines."""
+    header = ["** Results Report"] * 5 + ["TIME " + "COL " * (num_cols - 1)]
+    table = np.cumsum(rng.uniform(0, 100, (num_times, num_cols)), axis=0)
+    np.savetxt(path, table, fmt="%.6e", delimiter="\t",
+               header="\n".join(header), comments="")
+
+
+def legacy_read(path):
+    """ Former parsing of PyMEX.get_production."""
+    with open(path) as rwo:
+        content_rwo = np.loadtxt(rwo, skiprows=6, usecols=range(0, 10))
+    return (content_rwo[:, [0]], content_rwo[:, range(1, 5)],
+            content_rwo[:, range(5, 9)], content_rwo[:, [9]])
+
+
+def new_read(path):
+    """ Parsing with read_rwo."""
+    return rwo_columns(read_rwo(path))
+
+
+def buffer_read(path, skiprows=6, num_cols=10):
+    """ Parsing of the data lines as one buffer, without np.loadtxt."""
+    with open(path, "rb") as rwo:
+        content = rwo.read()
+    start = 0
+    for _ in range(skiprows):
+        start = content.index(b"\n", start) + 1
+    line_cols = len(content[start:content.index(b"\n", start)].split())
+    values = np.fromstring(content[start:].decode(), sep=" ")
+    return rwo_columns(values.reshape(-1, line_cols)[:, :num_cols])
+
+
+def best_time(func, repeat):
+    """ Best time of repeat calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """ Time the readers."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    cases = [(121, 10), (3650, 10), (36500, 10), (36500, 100)]
+
+    print(f"{'rows':>6} {'cols':>5} {'legacy [ms]':>13} {'rwo [ms]':>9}"
+          f" {'speedup':>8} {'buffer [ms]':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for num_times, num_cols in cases:
+            path = Path(folder) / f"run_{num_times}_{num_cols}.rwo"
+            write_rwo(path, num_times, num_cols, rng)
+            for old_col, new_col, buffer_col in zip(
+                    legacy_read(path), new_read(path), buffer_read(path)):
+                assert np.array_equal(old_col, new_col)
+                assert np.array_equal(buffer_col, new_col)
+            old = best_time(lambda: legacy_read(path), args.repeat)
+            new = best_time(lambda: new_read(path), args.repeat)
+            buffer = best_time(lambda: buffer_read(path), args.repeat)
+            print(f"{num_times:>6} {num_cols:>5} {1e3 * old:>13.2f}"
+                  f" {1e3 * new:>9.2f} {old / new:>8.1f}"
+                  f" {1e3 * buffer:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+""" End-to-end benchmark of the SAO sequence.
+
+Runs Sequence on analytic test functions and on the proxy reservoir
+backend with fixed seeds and reports, for each case, the time spent in
+each phase (DoE, simulation, surrogate fit, subproblem, results I/O),
+the high fidelity evaluations needed to reach the target, and the
+peak memory. The memory is traced in a separate, untimed run of each
+case (skip it with --skip-memory). The report is written as JSON.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sao --functions sphere rosen --dims 10 50
+    python -m benchmarks.bench_sao --proxy --output bench_sao.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import wraps
+import numpy as np
+import scipy
+from scipy.optimize import Bounds
+from sao_opt.doe import ConstrainedDoE
+from sao_opt.trust_region import TrustRegion
+from sao_opt.opt_problem import OptimizationProblem
+from sao_opt.surrogate import RbfPoly
+from sao_opt.solver import TrustConstrSolver
+from sao_opt.sequence import Sequence
+from sao_opt.converge import Converge
+from sao_opt.results import Results
+from sao_opt.profiling import PhaseTimer
+
+
+def sphere(samples):
+    """ Sphere function, minimum 0 in x = 0."""
+    return np.sum(samples ** 2, axis=1)
+
+
+def rosen(samples):
+    """ Rosenbrock function, minimum 0 in x = 1."""
+    return np.sum(100 * (samples[:, 1:] - samples[:, :-1] ** 2) ** 2 +
+                  (1 - samples[:, :-1]) ** 2, axis=1)
+
+
+def rastrigin(samples):
+    """ Rastrigin function, minimum 0 in x = 0."""
+    return 10 * samples.shape[1] + np.sum(
+        samples ** 2 - 10 * np.cos(2 * np.pi * samples), axis=1)
+
+
+# function, lower and upper bound of each variable
+FUNCTIONS = {"sphere": (sphere, -5.0, 5.0),
+             "rosen": (rosen, -2.0, 2.0),
+             "rastrigin": (rastrigin, -5.12, 5.12)}
+
+PHASES = ("doe", "simulation", "surrogate", "subproblem", "results_io")
+
+
+class FunctionProblem:
+
+    """Analytic function with the interface of OptimizationProblem."""
+
+    def __init__(self, func, lower, upper, dim, opt_param):
+        self.func = func
+        self.bounds = Bounds(np.full((dim, 1), lower),
+                             np.full((dim, 1), upper))
+        self.linear = None
+        self.num_simulations = 0
+        self.delta = opt_param["delta"]
+        self.ite_max_sao = opt_param["ite_max_sao"]
+        self.tol_opt = opt_param["tol_opt"]
+        self.tol_delta = opt_param["tol_delta"]
+        self.num_starts = opt_param["num_starts"]
+        self.num_infill = opt_param["num_infill"]
+
+    def high_fidelity(self, controls):
+        """ Evaluate the function for a batch of controls."""
+        self.num_simulations += len(controls)
+        return self.func(controls)
+
+    def submit(self, controls):
+        """ Futures already resolved, like the pool engine."""
+        futures = []
+        for value in self(np.atleast_2d(controls)):
+            futures.append(Future())
+            futures[-1].set_result(value)
+        return futures
+
+    def close(self):
+        """ Nothing to release."""
+
+    def __call__(self, controls):
+        controls = np.asarray(controls, dtype=float)
+        values = self.high_fidelity(np.atleast_2d(controls))
+        if controls.ndim == 1:
+            return values[0]
+        return values
+
+
+class History:
+
+    """Every high fidelity value given to the surrogate archive."""
+
+    def __init__(self, surrogate):
+        self.values = []
+        add_to_archive = surrogate.add_to_archive
+
+        @wraps(add_to_archive)
+        def record(points, values, *args, **kwargs):
+            self.values.extend(np.atleast_1d(values).tolist())
+            return add_to_archive(points, values, *args, **kwargs)
+
+        surrogate.add_to_archive = record
+
+    def evaluations_to(self, f_start, f_opt, fraction):
+        """ Evaluations until fraction of f_start - f_opt is gained."""
+        best = np.minimum.accumulate(self.values)
+        target = f_start - fraction * (f_start - f_opt)
+        reached = np.flatnonzero(best <= target)
+        return int(reached[0]) + 1 if len(reached) else None
+
+
+def build_case(problem, x_init, clock=None, loo_tol=None):
+    """ SAO objects of main.py, with the timed phases if clock."""
+    trust_region = TrustRegion(x_init, problem)
+    doe = ConstrainedDoE(trust_region.lower, trust_region.upper,
+                         problem.linear)
+    surrogate = RbfPoly(doe, loo_tol=loo_tol)
+    solver = TrustConstrSolver(problem.linear, problem.num_starts,
+                               num_infill=problem.num_infill)
+    results = Results(surrogate, problem)
+    converge = Converge(results, problem)
+    if clock is None:
+        return Sequence(problem, trust_region, surrogate, solver, converge,
+                        results)
+    clock.wrap(doe, "create_samples", "doe")
+    clock.wrap(problem, "high_fidelity", "simulation")
+    clock.wrap(results, "evaluate_batch", "simulation")
+    clock.wrap(surrogate, "fit", "surrogate")
+    clock.wrap(solver, "maximize_npv", "subproblem")
+    clock.wrap(results, "describe", "results_io")
+    return Sequence(problem, trust_region, surrogate, solver, converge,
+                    results)
+
+
+@contextmanager
+def in_directory(path):
+    """ Run the block in path, the results store is written there."""
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def run_sequence(problem, x_init, args, clock=None):
+    """ Run the sequence from the seed in a temporary directory."""
+    np.random.seed(args.seed)
+    sequence = build_case(problem, x_init, clock, args.loo_tol)
+    history = History(sequence.surrogate)
+    with tempfile.TemporaryDirectory() as workdir, in_directory(workdir):
+        sequence.run()
+    return sequence, history
+
+
+def peak_memory(problem, x_init, args):
+    """ Peak traced memory of the case, in MB.
+
+    tracemalloc slows down every allocation, so the memory is measured
+    in a pass of its own, without the phase timers.
+    """
+    tracemalloc.start()
+    try:
+        run_sequence(problem, x_init, args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def run_case(name, problem, x_init, f_opt, args):
+    """ Run one SAO case and return its report."""
+    f_start = float(problem(x_init))
+    peak = None if args.skip_memory else peak_memory(problem, x_init, args)
+    problem.num_simulations = 0
+    clock = PhaseTimer()
+    start = time.perf_counter()
+    sequence, history = run_sequence(problem, x_init, args, clock)
+    total = time.perf_counter() - start
+    problem.close()
+    best = float(np.min(history.values))
+    if f_opt is None:
+        f_opt = best
+    return {"case": name,
+            "dim": len(x_init),
+            "seed": args.seed,
+            "iterations": len(sequence.results.count),
+            "total_s": total,
+            "phases_s": {phase: clock.totals.get(phase, 0.0)
+                         for phase in PHASES},
+            "other_s": total - sum(clock.totals.values()),
+            "hf_evaluations": problem.num_simulations,
+            "hf_to_target": history.evaluations_to(f_start, f_opt,
+                                                   args.target),
+            "f_start": f_start,
+            "f_best": best,
+            "peak_traced_mb": peak,
+            "max_rss_mb": resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def opt_parameters(args):
+    """ SAO parameters of the benchmark."""
+    return {"delta": 0.5, "ite_max_sao": args.iterations,
+            "tol_opt": 1.0e-5, "tol_delta": 1.0e-3,
+            "num_starts": args.num_starts, "num_infill": args.num_infill}
+
+
+def function_cases(args):
+    """ Analytic function cases, x_init fixed by the seed."""
+    for name in args.functions:
+        func, lower, upper = FUNCTIONS[name]
+        for dim in args.dims:
+            problem = FunctionProblem(func, lower, upper, dim,
+                                      opt_parameters(args))
+            rng = np.random.default_rng(args.seed)
+            x_init = rng.uniform(lower, upper, dim)
+            yield f"{name}-{dim}", problem, x_init, 0.0
+
+
+def proxy_cases(args):
+    """ Reservoir case with the proxy backend, from the config files."""
+    problem = OptimizationProblem()
+    problem.opt_param.update({"backend": "proxy",
+                              "pool_size": args.pool_size})
+    problem.res_param.setdefault("proxy", {})
+    problem.res_param["proxy"] = dict(problem.res_param["proxy"] or {},
+                                      latency=args.latency)
+    problem.cache = None
+    problem.ite_max_sao = args.iterations
+    problem.num_starts = args.num_starts
+    problem.num_infill = args.num_infill
+    yield "proxy", problem, problem.nominal, None
+
+
+def environment():
+    """ Versions of the software used in the run."""
+    return {"python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def main():
+    """ Run the cases and write the JSON report."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--functions", nargs="*", default=list(FUNCTIONS),
+                        choices=list(FUNCTIONS))
+    parser.add_argument("--dims", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--proxy", action="store_true",
+                        help="also run the proxy reservoir backend")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds per proxy run")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--num-starts", type=int, default=1)
+    parser.add_argument("--num-infill", type=int, default=1)
+    parser.add_argument("--target", type=float, default=0.99,
+                        help="fraction of f_start - f_opt to be gained")
+    parser.add_argument("--loo-tol", type=float, default=None,
+                        help="adaptive DoE size, see RbfPoly")
+    parser.add_argument("--skip-memory", action="store_true",
+                        help="no untimed pass to measure the peak memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_sao.json")
+    args = parser.parse_args()
+
+    cases = list(function_cases(args))
+    if args.proxy:
+        cases.extend(proxy_cases(args))
+    reports = []
+    print(f"{'case':>16} {'total [s]':>10} {'hf':>6} {'to target':>10}"
+          f" {'peak [MB]':>10}")
+    for name, problem, x_init, f_opt in cases:
+        report = run_case(name, problem, x_init, f_opt, args)
+        reports.append(report)
+        print(f"{name:>16} {report['total_s']:>10.2f}"
+              f" {report['hf_evaluations']:>6}"
+              f" {str(report['hf_to_target']):>10}"
+              f" {report['peak_traced_mb'] or 0.0:>10.1f}")
+    with open(args.output, "w") as file:
+        json.dump({"environment": environment(), "args": vars(args),
+                   "cases": reports}, file, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
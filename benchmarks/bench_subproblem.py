@@ -0,0 +1,60 @@
+""" Benchmark of the trust region subproblem with and without the
+analytic gradient of RbfPoly.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_subproblem --dims 36 88
+"""
+import time
+import argparse
+import numpy as np
+from scipy.optimize import minimize
+from sao_opt.doe import RandomDoE
+from sao_opt.surrogate import RbfPoly
+
+
+def rosen(samples):
+    """ Rosenbrock function for many samples."""
+    return np.sum(100 * (samples[:, 1:] - samples[:, :-1] ** 2) ** 2 +
+                  (1 - samples[:, :-1]) ** 2, axis=1)
+
+
+def fit_surrogate(dim):
+    """ RbfPoly fitted to the Rosenbrock function in [0, 1]^dim."""
+    lower, upper = np.zeros(dim), np.ones(dim)
+    doe = RandomDoE(lower, upper)
+    doe(lower, upper, 1)
+    surrogate = RbfPoly(doe)
+    surrogate.update(rosen)
+    return surrogate
+
+
+def solve(surrogate, jac):
+    """ Time one SLSQP solve, return time, nfev and optimum."""
+    dim = surrogate.dim
+    start = time.perf_counter()
+    result = minimize(surrogate, np.full(dim, 0.5), method="SLSQP",
+                      jac=jac, bounds=[(0, 1)] * dim)
+    return time.perf_counter() - start, result.nfev, result.fun
+
+
+def main():
+    """ Compare finite differences and analytic gradient."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dims", type=int, nargs="+", default=[36, 88])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    np.random.seed(args.seed)
+
+    print(f"{'dim':>5} {'fd [s]':>8} {'fd nfev':>8} {'jac [s]':>8}"
+          f" {'jac nfev':>9} {'speedup':>8}")
+    for dim in args.dims:
+        surrogate = fit_surrogate(dim)
+        time_fd, nfev_fd, _ = solve(surrogate, None)
+        time_jac, nfev_jac, _ = solve(surrogate, surrogate.gradient)
+        print(f"{dim:>5} {time_fd:>8.3f} {nfev_fd:>8} {time_jac:>8.3f}"
+              f" {nfev_jac:>9} {time_fd / time_jac:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
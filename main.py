@@ -1,6 +1,7 @@
 """ Framework layout to run SAO - Sequential Approximate Optimizaion."""
 import time
-from sao_opt.doe import RandomDoE
+import argparse
+from sao_opt.doe import ConstrainedDoE
 from sao_opt.trust_region import TrustRegion
 from sao_opt.opt_problem import OptimizationProblem, Simulation
 from sao_opt.surrogate import RbfPoly
@@ -9,6 +10,13 @@ from sao_opt.sequence import Sequence
 from sao_opt.converge import Converge
 from sao_opt.results import Results
 from sao_opt.write_results import WriteResults
+from sao_opt.profiling import create_profiler
+from sao_opt.checkpoint import create_checkpoint
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--resume", action="store_true",
+                    help="continue from the last checkpoint")
+args = parser.parse_args()
 
 # Start time
 start = time.time()
@@ -27,25 +35,34 @@ x0 = simulation.nominal
 trust_region = TrustRegion(x0, problem)
 
 # Lhs sample
-doe = RandomDoE(trust_region.lower, trust_region.upper)
+doe = ConstrainedDoE(trust_region.lower, trust_region.upper,
+                     problem.linear, seed=problem.opt_param.get("doe_seed"))
 
-# Surrogate model
-surrogate = RbfPoly(doe)
+# Surrogate model, the DoE size is adaptive if loo_tol is set
+surrogate = RbfPoly(doe, loo_tol=problem.opt_param.get("loo_tol"),
+                    min_samples=problem.opt_param.get("doe_min_samples"),
+                    batch_size=problem.opt_param.get("doe_batch"))
 
 # Optimizer Solver
-solver = TrustConstrSolver(problem.linear)
+solver = TrustConstrSolver(problem.linear, problem.num_starts,
+                           num_infill=problem.num_infill)
 
 # Results
-results = Results(surrogate)
+results = Results(surrogate, simulation)
 
 # Converge
 converge = Converge(results, problem)
 
 
 # ---------- Sequence Layer -----------------
+profiler = create_profiler(problem.opt_param)
+checkpoint = create_checkpoint(problem.opt_param)
 sequence = Sequence(simulation, trust_region, surrogate,
-                    solver, converge, results)
+                    solver, converge, results, profiler, checkpoint)
+if args.resume and not sequence.resume():
+    print("No checkpoint found, starting a new optimization.")
 sequence.run()
+simulation.close()
 
 end = time.time()
 time_spend = end - start
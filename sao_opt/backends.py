@@ -0,0 +1,161 @@
+""" High fidelity simulators used by the optimization."""
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+from PyMEX.utilits import ParallelPyMex, AsyncPyMex
+from PyMEX.utilits.proxy import TankProxy
+
+
+def done_future(value):
+    """ Future already resolved with value."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class SimulatorBackend(ABC):
+
+    """Interface of the simulators.
+
+    A backend prepares its resources, starts a batch of runs and
+    collects the npv and status ("ok", "timeout", "failed" or "killed")
+    of each run. run_batch returns one future per control, so the
+    backends that run in background can be used while the batch is
+    running. Runs that can't be better than threshold may be stopped
+    before the end, their npv is then an optimistic bound.
+    """
+
+    def __init__(self, res_param, pool_size=None):
+        """
+        Parameters
+        ----------
+        res_param: dictionary
+            Reservoir parameters
+        pool_size: int
+            Number of simultaneous runs, None is sequential.
+
+        """
+        self.res_param = res_param
+        self.pool_size = pool_size
+
+    def prepare(self):
+        """ Create the resources used by the runs."""
+
+    @abstractmethod
+    def run_batch(self, controls, threshold=None):
+        """ Start the runs of the controls.
+
+        Returns
+        -------
+        list of concurrent.futures.Future with the npv and status of
+        each run.
+        """
+
+    @staticmethod
+    def collect(runs):
+        """ Wait for the runs, return the npv array and status list."""
+        if not runs:
+            return np.array([]), []
+        npv, status = zip(*[run.result() for run in runs])
+        return np.array(npv), list(status)
+
+    def evaluate(self, controls, threshold=None):
+        """ Run the controls and wait for the results."""
+        self.prepare()
+        return self.collect(self.run_batch(controls, threshold))
+
+    def close(self):
+        """ Release the resources of the backend."""
+
+
+class ImexPoolBackend(SimulatorBackend):
+
+    """IMEX runs in a new process pool for each batch."""
+
+    def run_batch(self, controls, threshold=None):
+        controls = np.atleast_2d(controls)
+        if not len(controls):
+            return []
+        batch = controls[0] if len(controls) == 1 else controls
+        model = ParallelPyMex(batch, self.res_param, self.pool_size,
+                              threshold)
+        npv = np.atleast_1d(model.pool_pymex())
+        return [done_future(run) for run in zip(npv, model.status)]
+
+
+class ImexAsyncBackend(SimulatorBackend):
+
+    """IMEX runs in the long-lived asynchronous engine."""
+
+    def __init__(self, res_param, pool_size=None):
+        super().__init__(res_param, pool_size)
+        self.engine = None
+
+    def prepare(self):
+        if self.engine is None:
+            self.engine = AsyncPyMex(self.res_param, self.pool_size)
+
+    def run_batch(self, controls, threshold=None):
+        self.prepare()
+        return [self.engine.submit_run(control, threshold)
+                for control in np.atleast_2d(controls)]
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.close()
+            self.engine = None
+
+
+class ProxyBackend(SimulatorBackend):
+
+    """Synthetic tank reservoir with a tunable run time.
+
+    The npv of the whole batch is computed at once and each run
+    is delivered after res_param["proxy"]["latency"] seconds by
+    pool_size workers, like pool_size simulator licenses.
+    """
+
+    def __init__(self, res_param, pool_size=None):
+        super().__init__(res_param, pool_size)
+        self.proxy = TankProxy(res_param)
+        self.latency = (res_param.get("proxy") or {}).get("latency", 0.0)
+        self.executor = None
+
+    def prepare(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(self.pool_size or 1)
+
+    def run(self, npv):
+        """ One run of the proxy."""
+        time.sleep(self.latency)
+        return npv, "ok"
+
+    def run_batch(self, controls, threshold=None):
+        controls = np.atleast_2d(controls)
+        if not len(controls):
+            return []
+        npv = self.proxy.npv(controls)
+        if not self.latency:
+            return [done_future((value, "ok")) for value in npv]
+        self.prepare()
+        return [self.executor.submit(self.run, value) for value in npv]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+BACKENDS = {"imex": ImexPoolBackend,
+            "imex_async": ImexAsyncBackend,
+            "proxy": ProxyBackend}
+
+
+def create_backend(name, res_param, pool_size=None):
+    """ Create the backend registered with name."""
+    try:
+        return BACKENDS[name](res_param, pool_size)
+    except KeyError:
+        raise ValueError(f"Unknown simulator backend '{name}', "
+                         f"use one of {sorted(BACKENDS)}.") from None
@@ -0,0 +1,111 @@
+""" Persistent cache for the high fidelity simulations."""
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+
+class SimulationCache:
+
+    """Content-addressed on-disk cache with LRU eviction."""
+
+    def __init__(self, res_param, cache_dir=".sim_cache", max_size=1000,
+                 decimals=6):
+        """
+        Parameters
+        ----------
+        res_param: dictionary
+            Reservoir parameters, part of the cache key.
+        cache_dir: str
+            Folder where the cache index is saved.
+        max_size: int
+            Maximum number of entries kept in the cache.
+        decimals: int
+            Number of decimals used to quantize the controls.
+
+        """
+        self.path = Path(cache_dir)
+        self.index_file = self.path / "index.json"
+        self.max_size = max_size
+        self.decimals = decimals
+        self.model_digest = self.digest_model(res_param)
+        self.entries = self.load()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest_model(res_param):
+        """ Digest of the reservoir parameters and template file."""
+        sha = hashlib.sha1()
+        sha.update(json.dumps(res_param, sort_keys=True,
+                              default=str).encode())
+        if "path" in res_param and "template" in res_param:
+            tpl_name = Path(res_param["path"]) / res_param["template"]
+            if tpl_name.is_file():
+                sha.update(tpl_name.read_bytes())
+        return sha.hexdigest()
+
+    def key(self, control):
+        """ Hash of the quantized control vector."""
+        control = np.round(np.asarray(control, dtype=float),
+                           self.decimals) + 0.0
+        sha = hashlib.sha1(self.model_digest.encode())
+        sha.update(np.ascontiguousarray(control).tobytes())
+        return sha.hexdigest()
+
+    def load(self):
+        """ Read the cache index from disk."""
+        if self.index_file.is_file():
+            with open(self.index_file) as file:
+                return OrderedDict(json.load(file))
+        return OrderedDict()
+
+    def save(self):
+        """ Write the cache index, replacing the old one atomically."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        temp_file = self.index_file.with_suffix(".tmp")
+        with open(temp_file, "w") as file:
+            json.dump(list(self.entries.items()), file)
+        os.replace(temp_file, self.index_file)
+
+    def lookup(self, controls):
+        """ Search the controls in the cache.
+
+        Parameters
+        ----------
+        controls: array (num_controls, dim)
+
+        Returns
+        -------
+        values: array
+            Cached values, nan where the control was not found.
+        found: array of bool
+            Mask of the controls found in the cache.
+
+        """
+        values = np.full(len(controls), np.nan)
+        found = np.zeros(len(controls), dtype=bool)
+        for index, control in enumerate(controls):
+            key = self.key(control)
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                values[index] = self.entries[key]
+                found[index] = True
+        self.hits += int(found.sum())
+        self.misses += int((~found).sum())
+        return values, found
+
+    def store(self, controls, values):
+        """ Add the simulated values and evict the least recently used."""
+        for control, value in zip(controls, np.atleast_1d(values)):
+            key = self.key(control)
+            self.entries[key] = float(value)
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        self.save()
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,107 @@
+""" Checkpoint and resume of the SAO sequence."""
+import os
+import pickle
+from pathlib import Path
+import numpy as np
+from .results_store import ResultsStore
+
+# Attributes saved from each object of the sequence
+TRUST_REGION = ("x_center", "delta", "pho", "new_lower", "new_upper")
+HISTORY = ("count", "fob_center", "fob_star", "fap_center", "fap_star",
+           "x_center", "x_star", "delta", "pho", "x_best")
+SURROGATE = ("archive_x", "archive_y", "killed_x")
+SIMULATION = ("num_simulations", "num_failures", "best")
+
+
+class Checkpoint:
+
+    """Periodic snapshot of the state of Sequence.run.
+
+    The trust region, the results history, the surrogate archive, the
+    state of the numpy global generator (used by the LHS) and the
+    simulation counters are saved after every `every` iterations. A
+    new sequence restored from the file continues from the next
+    iteration, the archive samples are not simulated again.
+    """
+
+    version = 1
+
+    def __init__(self, path="checkpoint.pkl", every=1):
+        """
+        Parameters
+        ----------
+        path: str
+            Checkpoint file, replaced atomically in each save.
+        every: int
+            Number of iterations between the checkpoints.
+
+        """
+        self.path = Path(path)
+        self.every = max(1, every)
+
+    def exists(self):
+        """ Verify if there is a checkpoint to resume."""
+        return self.path.is_file()
+
+    @staticmethod
+    def state(sequence):
+        """ State of the sequence as a dictionary."""
+        def attributes(obj, names):
+            return {name: getattr(obj, name) for name in names
+                    if hasattr(obj, name)}
+
+        return {"trust_region": attributes(sequence.trust_region,
+                                           TRUST_REGION),
+                "results": attributes(sequence.results, HISTORY),
+                "surrogate": attributes(sequence.surrogate, SURROGATE),
+                "simulation": attributes(sequence.simulation, SIMULATION),
+                "random_state": np.random.get_state()}
+
+    def save(self, sequence):
+        """ Write the checkpoint of the sequence."""
+        state = dict(self.state(sequence), version=self.version)
+        temp_file = self.path.with_suffix(".tmp")
+        with open(temp_file, "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, self.path)
+
+    def update(self, sequence):
+        """ Save the checkpoint if the iteration is due."""
+        if sequence.results.count[-1] % self.every == 0:
+            self.save(sequence)
+
+    def load(self):
+        """ Read the checkpoint file."""
+        with open(self.path, "rb") as file:
+            state = pickle.load(file)
+        if state.get("version") != self.version:
+            raise ValueError(f"Checkpoint {self.path} has version "
+                             f"{state.get('version')}, expected "
+                             f"{self.version}.")
+        return state
+
+    def restore(self, sequence):
+        """ Set the state of the checkpoint in the sequence.
+
+        The rows of the results store written after the checkpoint
+        are dropped, so the history is not repeated.
+        """
+        state = self.load()
+        for key in ("trust_region", "results", "surrogate", "simulation"):
+            for name, value in state[key].items():
+                setattr(getattr(sequence, key), name, value)
+        np.random.set_state(state["random_state"])
+        results = sequence.results
+        results.store = ResultsStore(results.store_path, mode="a")
+        results.store.truncate(len(results.count))
+        sequence.converge.results = results
+        print(f"Resumed from {self.path} after iteration "
+              f"{results.count[-1] if results.count else 0}.")
+
+
+def create_checkpoint(opt_param):
+    """ Checkpoint of the configuration, None if it's disabled."""
+    path = opt_param.get("checkpoint_file")
+    if path is None:
+        return None
+    return Checkpoint(path, opt_param.get("checkpoint_every", 1))
@@ -1,5 +1,9 @@
 """ Create a class for design experiments in SAO. """
-from pyDOE import lhs, bbdesign
+import numpy as np
+from pyDOE import bbdesign
+from scipy.optimize import linprog
+from scipy.spatial import distance
+from .lhs import optimized_lhs
 
 
 class DoE:
@@ -78,9 +82,17 @@ class RandomDoE(DoE):
 
     """Random points for design experiments."""
 
-    def __init__(self, min_values, max_values):
-        """Points created by random methods."""
+    def __init__(self, min_values, max_values, seed=None):
+        """Points created by random methods.
+
+        Parameters
+        ----------
+        seed: int
+            Seed of the LHS. With a seed the normalized design is
+            computed once and only rescaled to each new region.
+        """
         super().__init__(min_values, max_values)
+        self.seed = seed
         self.samples = []
 
     def create_samples(self):
@@ -95,7 +107,7 @@ class RandomDoE(DoE):
         np.array - (num_samples, num_dim)
 
         """
-        return lhs(self.dim, self.num_samples, criterion='m')
+        return optimized_lhs(self.dim, self.num_samples, self.seed)
 
     def __call__(self, new_lb, new_ub, delta):
         """ Create a new samples for new bounds."""
@@ -105,6 +117,148 @@ class RandomDoE(DoE):
         self.create_samples()
 
 
+class ConstrainedDoE(RandomDoE):
+
+    """LHS points inside the bounds and the linear constraints.
+
+    The LHS of the box is pulled toward a feasible center along each
+    ray until the point satisfies lb <= A x <= ub. Then a few
+    hit-and-run sweeps move each point along random chords of the
+    feasible region when that increases its distance to the nearest
+    point (maximin), so the points don't pile on the constraints.
+    """
+
+    def __init__(self, min_values, max_values, linear=None, num_sweeps=5,
+                 num_moves=10, seed=None):
+        """
+        Parameters
+        ----------
+        linear: LinearConstraint
+            Linear constraints of the problem, None samples the box.
+        num_sweeps: int
+            Maximin sweeps over all the points.
+        num_moves: int
+            Random chords tried for each point in a sweep.
+
+        """
+        super().__init__(min_values, max_values, seed)
+        self.linear = linear
+        self.num_sweeps = num_sweeps
+        self.num_moves = num_moves
+
+    def inequalities(self):
+        """ Bounds and linear constraints as G x <= h."""
+        lower = np.asarray(self.min_values, dtype=float).ravel()
+        upper = np.asarray(self.max_values, dtype=float).ravel()
+        identity = np.eye(self.dim)
+        matrix = [identity, -identity]
+        rhs = [upper, -lower]
+        if self.linear is not None:
+            a_matrix = np.atleast_2d(np.asarray(self.linear.A, dtype=float))
+            a_upper = np.broadcast_to(self.linear.ub, len(a_matrix))
+            a_lower = np.broadcast_to(self.linear.lb, len(a_matrix))
+            finite = np.isfinite(a_upper)
+            matrix.append(a_matrix[finite])
+            rhs.append(a_upper[finite])
+            finite = np.isfinite(a_lower)
+            matrix.append(-a_matrix[finite])
+            rhs.append(-a_lower[finite])
+        return np.vstack(matrix), np.concatenate(rhs)
+
+    @staticmethod
+    def center(matrix, rhs):
+        """ Chebyshev center of G x <= h, None if it's empty."""
+        norms = np.linalg.norm(matrix, axis=1)
+        cost = np.zeros(matrix.shape[1] + 1)
+        cost[-1] = -1
+        res = linprog(cost, A_ub=np.column_stack((matrix, norms)), b_ub=rhs,
+                      bounds=[(None, None)] * matrix.shape[1] + [(0, None)])
+        if res.status != 0:
+            return None
+        return res.x[:-1]
+
+    @staticmethod
+    def project(points, center, matrix, rhs):
+        """ Move each point toward center until it's feasible."""
+        direction = points - center
+        step = direction.dot(matrix.T)
+        slack = np.maximum(rhs - matrix.dot(center), 0)
+        ratio = np.divide(slack, step, out=np.full(step.shape, np.inf),
+                          where=step > 1e-12)
+        scale = np.minimum(1, ratio.min(axis=1))
+        return center + scale[:, None] * direction
+
+    @staticmethod
+    def chords(point, directions, matrix, rhs):
+        """ Limits of the steps t keeping point + t * direction
+        feasible, for each direction."""
+        step = matrix.dot(directions.T)
+        slack = np.maximum(rhs - matrix.dot(point), 0)[:, None]
+        limit = np.divide(slack, step, out=np.zeros(step.shape),
+                          where=np.abs(step) > 1e-12)
+        t_max = np.where(step > 1e-12, limit, np.inf).min(axis=0)
+        t_min = np.where(step < -1e-12, limit, -np.inf).max(axis=0)
+        return t_min, t_max
+
+    def generator(self):
+        """ Random generator of the refinement.
+
+        Seeded with seed, so a seeded design doesn't depend on the
+        numpy global generator. Without it, the seed is drawn from the
+        global generator (np.random.seed reproduces it).
+        """
+        if self.seed is None:
+            return np.random.default_rng(np.random.randint(2 ** 31))
+        return np.random.default_rng(self.seed)
+
+    def refine(self, points, matrix, rhs, rng):
+        """ Hit-and-run maximin sweeps over the points.
+
+        Parameters
+        ----------
+        rng: np.random.Generator
+            Generator of the directions and steps.
+        """
+        width = np.asarray(self.get_delta(), dtype=float).ravel()
+        scale = np.where(width > 0, width, 1)
+        if not width.any():
+            return points
+        for _ in range(self.num_sweeps):
+            for index in range(len(points)):
+                others = np.delete(points, index, axis=0) / scale
+                current = distance.cdist(points[[index]] / scale,
+                                         others).min()
+                directions = rng.standard_normal(
+                    (self.num_moves, self.dim)) * width
+                t_min, t_max = self.chords(points[index], directions,
+                                           matrix, rhs)
+                t_step = t_min + rng.random(self.num_moves) * \
+                    (t_max - t_min)
+                moves = points[index] + t_step[:, None] * directions
+                nearest = distance.cdist(moves / scale, others).min(axis=1)
+                best = int(np.argmax(nearest))
+                if nearest[best] > current:
+                    points[index] = moves[best]
+        return points
+
+    def create_samples(self):
+        """ Update the samples, all of them feasible."""
+        points = self.determine_plan_points(self.lhs_points())
+        if self.linear is None:
+            self.samples = points
+            return
+        matrix, rhs = self.inequalities()
+        center = self.center(matrix, rhs)
+        if center is None:
+            # the trust region has no feasible point
+            self.samples = points
+            return
+        points = self.project(points, center, matrix, rhs)
+        if len(points) > 1:
+            points = self.refine(points, matrix, rhs, self.generator())
+        self.samples = points
+
+
 class ResponseSurface(DoE):
 
     """ Response Surface Designs from PyDOE."""
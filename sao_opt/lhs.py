@@ -0,0 +1,150 @@
+""" Optimized Latin Hypercube designs in the unit cube."""
+from functools import lru_cache
+import numpy as np
+from scipy.spatial import distance
+
+
+def random_lhs(dim, num_samples, rng):
+    """ Random LHS, one point in each of the num_samples strata of
+    every dimension."""
+    strata = np.argsort(rng.random((num_samples, dim)), axis=0)
+    return (strata + rng.random((num_samples, dim))) / num_samples
+
+
+def phi_p(sq_dist, power):
+    """ Morris-Mitchell criterion of the squared distances."""
+    pairs = sq_dist[np.triu_indices(len(sq_dist), 1)]
+    return np.sum(pairs ** (-power / 2)) ** (1 / power)
+
+
+class MaximinLHS:
+
+    """Swap-based maximin optimization of an LHS.
+
+    Each step swaps the values of two points in one column, which
+    keeps the Latin property. Many swaps of the column are scored at
+    once from the distances of the two rows only, and the best one is
+    accepted if it doesn't worsen the phi_p criterion by more than a
+    threshold (enhanced stochastic evolutionary algorithm). The
+    threshold decreases while the design is improving.
+    """
+
+    def __init__(self, dim, num_samples, power=50, num_swaps=50,
+                 num_steps=None, num_cycles=10, seed=None):
+        """
+        Parameters
+        ----------
+        power: int
+            Exponent of phi_p, large values approach maximin.
+        num_swaps: int
+            Pairs of points tried in each step.
+        num_steps: int
+            Steps of each cycle, default 2 * dim.
+        num_cycles: int
+            Cycles of threshold update.
+        seed: int, np.random.Generator
+            Random generator of the design.
+
+        """
+        self.dim = dim
+        self.num_samples = num_samples
+        self.power = power
+        self.num_swaps = num_swaps
+        self.num_steps = num_steps or 2 * dim
+        self.num_cycles = num_cycles
+        self.rng = np.random.default_rng(seed)
+
+    def swap_delta(self, values, sq_dist, rows_i, rows_j):
+        """ Change of sum(d^-p) for each swap of the column values
+        between rows_i and rows_j, and the new rows of sq_dist."""
+        old_i = (values[rows_i][:, None] - values) ** 2
+        old_j = (values[rows_j][:, None] - values) ** 2
+        new_i = sq_dist[rows_i] - old_i + old_j
+        new_j = sq_dist[rows_j] - old_j + old_i
+        # the distance between the swapped points doesn't change
+        skip = np.zeros_like(new_i, dtype=bool)
+        index = np.arange(len(rows_i))
+        for rows in (rows_i, rows_j):
+            skip[index, rows] = True
+        exponent = -self.power / 2
+
+        def total(sq_rows):
+            sq_rows = np.where(skip, 1, np.maximum(sq_rows, 1e-12))
+            return np.where(skip, 0, sq_rows ** exponent)
+
+        delta = total(new_i).sum(axis=1) + total(new_j).sum(axis=1) - \
+            total(sq_dist[rows_i]).sum(axis=1) - \
+            total(sq_dist[rows_j]).sum(axis=1)
+        return delta, new_i, new_j
+
+    def optimize(self, points):
+        """ Improve the maximin distance of the LHS points."""
+        points = points.copy()
+        num = self.num_samples
+        if num < 3:
+            return points
+        sq_dist = distance.squareform(distance.pdist(points, "sqeuclidean"))
+        # distances scaled by the first min distance, so d^-p is finite
+        scale = sq_dist[np.triu_indices(num, 1)].min()
+        sq_dist /= scale
+        criterion = phi_p(sq_dist, self.power) ** self.power
+        best_points, best = points.copy(), criterion
+        threshold = 0.005 * criterion
+        for _ in range(self.num_cycles):
+            improved = False
+            for _ in range(self.num_steps):
+                column = self.rng.integers(self.dim)
+                rows_i = self.rng.integers(num, size=self.num_swaps)
+                rows_j = (rows_i + self.rng.integers(
+                    1, num, size=self.num_swaps)) % num
+                delta, new_i, new_j = self.swap_delta(
+                    points[:, column] / np.sqrt(scale), sq_dist, rows_i,
+                    rows_j)
+                pick = int(np.argmin(delta))
+                if delta[pick] > threshold * self.rng.random():
+                    continue
+                row_i, row_j = rows_i[pick], rows_j[pick]
+                points[[row_i, row_j], column] = \
+                    points[[row_j, row_i], column]
+                sq_dist[row_i], sq_dist[:, row_i] = new_i[pick], new_i[pick]
+                sq_dist[row_j], sq_dist[:, row_j] = new_j[pick], new_j[pick]
+                sq_dist[row_i, row_j] = sq_dist[row_j, row_i] = \
+                    np.sum((points[row_i] - points[row_j]) ** 2) / scale
+                sq_dist[row_i, row_i] = sq_dist[row_j, row_j] = 0
+                criterion += delta[pick]
+                if criterion < best:
+                    best_points, best = points.copy(), criterion
+                    improved = True
+            threshold *= 0.8 if improved else 1.25
+        return best_points
+
+    def __call__(self):
+        """ New optimized LHS, array (num_samples, dim)."""
+        return self.optimize(random_lhs(self.dim, self.num_samples,
+                                        self.rng))
+
+
+@lru_cache(maxsize=32)
+def _cached_lhs(dim, num_samples, seed):
+    """ Design of a fixed seed, computed once."""
+    points = MaximinLHS(dim, num_samples, seed=seed)()
+    points.setflags(write=False)
+    return points
+
+
+def optimized_lhs(dim, num_samples, seed=None):
+    """ Maximin LHS in the unit cube.
+
+    With seed, the design is cached per (dim, num_samples, seed), so
+    the same normalized design is only rescaled to each trust region.
+    Without it, a new design is drawn from the numpy global generator
+    (np.random.seed reproduces it).
+
+    Returns
+    -------
+    np.array - (num_samples, dim), read only if cached.
+    """
+    if seed is None:
+        return MaximinLHS(dim, num_samples,
+                          seed=np.random.randint(2 ** 31))()
+    return _cached_lhs(dim, num_samples, seed)
@@ -1,8 +1,11 @@
 """ Optimization problem to be solved."""
+import threading
+from concurrent.futures import Future
 import yaml
 import numpy as np
 from scipy.optimize import LinearConstraint, Bounds
-from PyMEX.utilits import ParallelPyMex
+from .backends import create_backend, done_future
+from .cache import SimulationCache
 
 
 class Simulation:
@@ -15,6 +18,12 @@ class Simulation:
         self.opt_param = self.opt_parameters()
         self.nominal = self.x_nominal()
         self.num_simulations = 0
+        self.num_failures = 0
+        self.best = np.inf
+        self.status = []
+        self.cache = self.create_cache()
+        self.backend = None
+        self.lock = threading.Lock()
 
     @staticmethod
     def reservoir_parameters():
@@ -62,14 +71,171 @@ class Simulation:
         rate_cycle = np.repeat([nom_prod, nom_inj], [nb_prod, nb_inj])
         return np.tile(rate_cycle, self.res_param["nb_cycles"])
 
+    def create_cache(self):
+        """ Create the simulation cache, None if it's disabled."""
+        cache_dir = self.opt_param.get("cache_dir")
+        if cache_dir is None:
+            return None
+        return SimulationCache(self.res_param, cache_dir,
+                               self.opt_param.get("cache_size", 1000),
+                               self.opt_param.get("cache_decimals", 6))
+
+    def use_async(self):
+        """ Verify if the asynchronous engine is selected."""
+        return self.opt_param.get("engine", "pool") == "async"
+
+    def backend_name(self):
+        """ Name of the simulator backend in the configuration."""
+        name = self.opt_param.get("backend", "imex")
+        if name == "imex" and self.use_async():
+            return "imex_async"
+        return name
+
+    def simulator(self):
+        """ Return the simulator backend, created on first use."""
+        if self.backend is None:
+            self.backend = create_backend(self.backend_name(),
+                                          self.res_param,
+                                          self.opt_param["pool_size"])
+        return self.backend
+
+    def close(self):
+        """ Release the simulator backend."""
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+
+    def kill_threshold(self):
+        """ Npv that a run must be able to beat to be completed.
+
+        Only with early_kill, after the first successful run. The
+        margin (fraction of the best npv) keeps the runs that are
+        almost as good, which are still useful to the surrogate.
+        """
+        if not self.res_param.get("early_kill", False) or \
+                not np.isfinite(self.best):
+            return None
+        margin = self.res_param.get("early_kill_margin", 0.0)
+        return self.best + margin * abs(self.best)
+
+    def update_best(self, npv, status):
+        """ Keep the best npv of the successful runs."""
+        success = np.array(status) == "ok"
+        if success.any():
+            self.best = min(self.best, np.min(np.asarray(npv)[success]))
+
+    def high_fidelity(self, controls):
+        """ Run the simulator for a batch of controls.
+
+        The status of each run is kept in self.status, failed runs
+        return the penalty npv and killed runs their npv bound.
+        """
+        self.num_simulations += len(controls)
+        npv, self.status = self.simulator().evaluate(controls,
+                                                     self.kill_threshold())
+        for control, value, status in zip(controls, npv, self.status):
+            self.report_failure(control, status, value)
+        self.update_best(npv, self.status)
+        return npv
+
+    def report_failure(self, control, status, npv=None):
+        """ Report a failed run, return True if it has failed."""
+        if status == "ok":
+            return False
+        if status == "killed":
+            print(f"Simulation killed for control {np.round(control, 4)},"
+                  f" npv bound {npv}")
+            return True
+        self.num_failures += 1
+        print(f"Simulation {status} for control {np.round(control, 4)}, "
+              f"npv penalty {self.res_param.get('failure_penalty', 0.0)}")
+        return True
+
+    def submit(self, controls):
+        """ Submit a batch of controls without waiting for it.
+
+        Only the backends that run in background return before the
+        batch is evaluated. The runs are never killed early, they are
+        the candidates of the optimum.
+
+        Returns
+        -------
+        list of concurrent.futures.Future, one for each control.
+        """
+        candidates = np.atleast_2d(controls)
+        if self.cache is None:
+            found = np.zeros(len(candidates), dtype=bool)
+        else:
+            with self.lock:
+                npv, found = self.cache.lookup(candidates)
+        futures = [done_future(npv[index]) if found[index] else Future()
+                   for index in range(len(candidates))]
+        missing = np.flatnonzero(~found)
+        self.num_simulations += len(missing)
+        simulator = self.simulator()
+        simulator.prepare()
+        runs = simulator.run_batch(candidates[missing])
+        for index, run in zip(missing, runs):
+            run.add_done_callback(self._store(candidates[index],
+                                              futures[index]))
+        return futures
+
+    def _store(self, control, future):
+        """ Callback to resolve future and cache the npv of a run."""
+        def store(run):
+            if run.exception() is not None:
+                future.set_exception(run.exception())
+                return
+            npv, status = run.result()
+            with self.lock:
+                failed = self.report_failure(control, status, npv)
+                self.update_best([npv], [status])
+                if self.cache is not None and not failed:
+                    self.cache.store([control], [npv])
+            future.set_result(npv)
+        return store
+
+    def evaluate(self, controls):
+        """ Npv and status of each control.
+
+        The cached controls have status "ok". A killed run has its
+        npv bound, which is not a simulated value.
+
+        Returns
+        -------
+        npv: array (num_controls,)
+        status: list of str
+        """
+        candidates = np.atleast_2d(np.asarray(controls))
+        if self.cache is None:
+            npv = self.high_fidelity(candidates)
+            return npv, list(self.status)
+        with self.lock:
+            npv, found = self.cache.lookup(candidates)
+        status = np.full(len(candidates), "ok", dtype=object)
+        if not found.all():
+            # Simulate each missing control only once
+            missing = candidates[~found]
+            unique, inverse = np.unique(missing, axis=0,
+                                        return_inverse=True)
+            values = self.high_fidelity(unique)
+            # Failed runs are not cached, they may succeed later
+            run_status = np.array(self.status, dtype=object)
+            success = run_status == "ok"
+            with self.lock:
+                self.cache.store(unique[success], values[success])
+            npv[~found] = values[inverse.ravel()]
+            status[~found] = run_status[inverse.ravel()]
+        return npv, status.tolist()
+
     def __call__(self, controls):
         """High fidelity model."""
-        pool_size = self.opt_param["pool_size"]
         if not isinstance(controls, np.ndarray):
             controls = np.array(controls)
-        model = ParallelPyMex(controls, self.res_param, pool_size)
-        self.num_simulations += controls.shape[0]
-        return model.pool_pymex()
+        npv, _ = self.evaluate(controls)
+        if controls.ndim == 1:
+            return npv[0]
+        return npv
 
 
 class OptimizationProblem(Simulation):
@@ -93,6 +259,8 @@ class OptimizationProblem(Simulation):
         self.ite_max_sao = self.opt_param["ite_max_sao"]
         self.tol_opt = self.opt_param["tol_opt"]
         self.tol_delta = self.opt_param["tol_delta"]
+        self.num_starts = self.opt_param.get("num_starts", 1)
+        self.num_infill = self.opt_param.get("num_infill", 1)
 
     def _create_matrix(self):
         """ Create matrix A for linear constraint."""
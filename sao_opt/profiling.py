@@ -0,0 +1,168 @@
+""" Opt-in instrumentation of the SAO sequence."""
+import json
+import time
+import cProfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+
+class PhaseTimer:
+
+    """Wall time and number of calls of nested phases.
+
+    The time of a phase does not include the phases nested in it,
+    so the simulations run inside the surrogate update or the results
+    update are counted only as simulation.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.stack = []
+
+    @contextmanager
+    def phase(self, name):
+        """ Time the block as the phase name."""
+        self.stack.append([time.perf_counter(), 0.0])
+        try:
+            yield
+        finally:
+            start, nested = self.stack.pop()
+            elapsed = time.perf_counter() - start
+            self.totals[name] += elapsed - nested
+            self.calls[name] += 1
+            if self.stack:
+                self.stack[-1][1] += elapsed
+
+    def wrap(self, obj, method, name):
+        """ Time every call of obj.method as the phase name."""
+        func = getattr(obj, method)
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with self.phase(name):
+                return func(*args, **kwargs)
+
+        setattr(obj, method, timed)
+
+    def reset(self):
+        """ Clear the timers."""
+        self.totals.clear()
+        self.calls.clear()
+
+
+class SequenceProfiler(PhaseTimer):
+
+    """Per-iteration timers and counters of Sequence.run.
+
+    Each iteration is written as one JSON line with the time of each
+    phase, the number of high fidelity simulations (and cache hits)
+    and the number of surrogate evaluations of the subproblem.
+    """
+
+    def __init__(self, log_file="profile.jsonl", use_cprofile=False,
+                 profile_file="profile.prof"):
+        """
+        Parameters
+        ----------
+        log_file: str
+            JSON lines file with one record per iteration.
+        use_cprofile: bool
+            Run the sequence under cProfile.
+        profile_file: str
+            File of the cProfile statistics, for pstats or snakeviz.
+        """
+        super().__init__()
+        self.log_file = log_file
+        self.profile = cProfile.Profile() if use_cprofile else None
+        self.profile_file = profile_file
+        self.sequence = None
+        self.log = None
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.last = {}
+        self.start = 0.0
+
+    def count_solves(self, solver):
+        """ Count the surrogate calls of each SLSQP run.
+
+        The runs of the multi-start are in threads, so only the
+        counters are updated there.
+        """
+        minimize_from = solver.minimize_from
+
+        @wraps(minimize_from)
+        def counted(x_start):
+            result = minimize_from(x_start)
+            with self.lock:
+                self.counters["slsqp_runs"] += 1
+                self.counters["surrogate_calls"] += result.nfev
+                self.counters["surrogate_gradients"] += getattr(result,
+                                                                "njev", 0)
+            return result
+
+        solver.minimize_from = counted
+
+    def attach(self, sequence):
+        """ Instrument the objects of the sequence."""
+        self.sequence = sequence
+        self.wrap(sequence.simulation, "high_fidelity", "simulation")
+        self.wrap(sequence.results, "evaluate_batch", "simulation")
+        self.count_solves(sequence.solver)
+        self.last = self.simulation_counters()
+
+    def simulation_counters(self):
+        """ Total simulations and cache hits up to now."""
+        simulation = self.sequence.simulation
+        counters = {"simulations": simulation.num_simulations}
+        cache = getattr(simulation, "cache", None)
+        if cache is not None:
+            counters["cache_hits"] = cache.hits
+        return counters
+
+    @contextmanager
+    def session(self):
+        """ Open the log and, if selected, run under cProfile."""
+        self.log = open(self.log_file, "w")
+        self.start = time.perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+        try:
+            yield self
+        finally:
+            if self.profile is not None:
+                self.profile.disable()
+                self.profile.dump_stats(self.profile_file)
+            self.log.close()
+            self.log = None
+
+    def end_iteration(self):
+        """ Write the record of the iteration and restart the timers."""
+        results = self.sequence.results
+        current = self.simulation_counters()
+        counters = {key: value - self.last.get(key, 0)
+                    for key, value in current.items()}
+        counters.update(self.counters)
+        record = {"iteration": results.count[-1],
+                  "elapsed": time.perf_counter() - self.start,
+                  "phases": dict(self.totals),
+                  "calls": dict(self.calls),
+                  "counters": counters,
+                  "delta": float(self.sequence.trust_region.delta),
+                  "fob_star": float(results.fob_star[-1]),
+                  "fob_center": float(results.fob_center[-1])}
+        self.log.write(json.dumps(record) + "\n")
+        self.log.flush()
+        self.last = current
+        self.counters.clear()
+        self.reset()
+
+
+def create_profiler(opt_param):
+    """ SequenceProfiler of the configuration, None if disabled."""
+    if not opt_param.get("profile", False):
+        return None
+    return SequenceProfiler(opt_param.get("profile_log", "profile.jsonl"),
+                            opt_param.get("cprofile", False))
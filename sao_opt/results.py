@@ -1,7 +1,7 @@
 """ Save the results along the optimization. """
 import numpy as np
-import pandas as pd
 from sao_opt.opt_problem import Simulation
+from sao_opt.results_store import ResultsStore
 
 
 class AppendResults:
@@ -18,42 +18,34 @@ class AppendResults:
         self.x_star = []
         self.delta = []
         self.pho = []
-        self.use_header = True
-        self.write_mode = "w"
+        self.store_path = "results"
+        self.store = None
 
     def describe(self, nfev):
-        """ Create a file to describe the optimization
-        evolution.
+        """ Append the last iteration to the results store.
+
+        The first call of a run starts a new store.
 
         Parameters
         ----------
-        level: int
-            Optimization level.
         nfev: int
             Number of functions evaluation
 
         """
-        datas = {
-            'fob_c': self.fob_center[-1],
-            'fob_s': self.fob_star[-1],
-            'fap_c': self.fap_center[-1],
-            'fap_s': self.fap_star[-1],
-            'x_c': [np.around(self.x_center[-1], 5)],
-            'x_s': [np.around(self.x_star[-1], 5)],
-            'delta': self.delta[-1],
-            'pho': self.pho[-1],
-            'nfev-hf': nfev
-        }
-        dframe = pd.DataFrame(datas)
-        dframe.to_csv("results.csv",
-                      mode=self.write_mode,
-                      sep='\t',
-                      index=False,
-                      encoding='utf-8',
-                      float_format='%.5f',
-                      header=self.use_header)
-        self.write_mode = "a"
-        self.use_header = False
+        if self.store is None:
+            self.store = ResultsStore(self.store_path, mode="w")
+        self.store.append({
+            'count': self.count[-1] if self.count else 0,
+            'fob_c': float(self.fob_center[-1]),
+            'fob_s': float(self.fob_star[-1]),
+            'fap_c': float(self.fap_center[-1]),
+            'fap_s': float(self.fap_star[-1]),
+            'x_c': np.asarray(self.x_center[-1], dtype=float),
+            'x_s': np.asarray(self.x_star[-1], dtype=float),
+            'delta': float(self.delta[-1]),
+            'pho': float(self.pho[-1]),
+            'nfev-hf': int(nfev)
+        })
 
     def update_count(self):
         """ Add counter."""
@@ -90,19 +82,25 @@ class Results(AppendResults):
 
     """Results of the simulation."""
 
-    def __init__(self, surrogate):
+    def __init__(self, surrogate, simulation=None):
         """Results from high fidelity model, surrogate model,
         delta and rho.
 
         Parameters
         ----------
+        surrogate: instance of RbfPoly()
         simulation: instance of Simulation()
+            Shared with the Sequence, so the cache and the number
+            of simulations are the same.
         """
         super().__init__()
-        self.simulation = Simulation()
+        if simulation is None:
+            simulation = Simulation()
+        self.simulation = simulation
         self._solver = []
         self._surrogate = surrogate
         self._trust_region = []
+        self.x_best = []
 
     @ property
     def solver(self):
@@ -153,19 +151,41 @@ class Results(AppendResults):
         x_center = self.solver.x_init
         return self.surrogate(x_center)
 
+    def evaluate_batch(self):
+        """ Evaluate the infill points and x_center as one batch.
+
+        All the points are submitted together to the high fidelity
+        model, the surrogate is evaluated while they run and every
+        result goes to the surrogate archive. The best infill point
+        is the new x_star.
+
+        Returns
+        -------
+        fobj: list
+            High fidelity values [fobj_star, fobj_center].
+        fap: list
+            Surrogate values [fap_star, fap_center].
+        """
+        infill = self.solver.infill_points()
+        points = np.vstack((infill, self.solver.x_init))
+        futures = self.simulation.submit(points)
+        fap = self.surrogate(points)
+        fobj = [future.result() for future in futures]
+        self.surrogate.add_to_archive(points, fobj)
+        best = int(np.argmin(fobj[:-1]))
+        self.x_best = infill[best]
+        return [fobj[best], fobj[-1]], [fap[best], fap[-1]]
+
     def fobj_list(self):
         """ Create a list of fobj and fap."""
-        fobj_star = self.evaluate_fobj_star()
-        fobj_center = self.evaluate_fobj_center()
-        fap_star = self.evaluate_fap_star()
-        fap_center = self.evaluate_fap_center()
-        return [fobj_star, fobj_center, fap_star, fap_center]
+        fobj, fap = self.evaluate_batch()
+        return [fobj[0], fobj[1], fap[0], fap[1]]
 
     def update(self):
         """ Update the results."""
         self.update_fobj(self.fobj_list())
         self.update_x_center(self.solver.x_init)
-        self.update_x_star(self.solver.result.x)
+        self.update_x_star(self.x_best)
         self.update_delta(self.trust_region.delta)
         self.update_pho(self.trust_region.pho)
         self.update_count()
@@ -0,0 +1,154 @@
+""" Append-only columnar store of the optimization history."""
+import os
+import json
+from pathlib import Path
+import numpy as np
+
+
+class ResultsStore:
+
+    """One raw binary file per column and a metadata record.
+
+    Each append writes one row to the end of every column file and
+    only then updates metadata.json (atomically), so a row is never
+    read half written. The columns are read back with np.memmap,
+    without parsing, with shape (num_rows, *row_shape).
+    """
+
+    def __init__(self, path="results", mode="a"):
+        """
+        Parameters
+        ----------
+        path: str
+            Folder of the store.
+        mode: str
+            "a" appends to an existing store, "w" starts a new one
+            and "r" only reads.
+
+        """
+        self.path = Path(path)
+        self.mode = mode
+        self.meta_file = self.path / "metadata.json"
+        if mode == "w" and self.meta_file.is_file():
+            for name in self.load()["columns"]:
+                self.column_file(name).unlink(missing_ok=True)
+            self.meta_file.unlink()
+        if mode != "r":
+            self.path.mkdir(parents=True, exist_ok=True)
+        self.meta = self.load()
+        if mode == "a":
+            self.drop_partial_rows()
+
+    def load(self):
+        """ Read the metadata record."""
+        if self.meta_file.is_file():
+            with open(self.meta_file) as file:
+                return json.load(file)
+        if self.mode == "r":
+            raise FileNotFoundError(f"No results store in {self.path}")
+        return {"num_rows": 0, "columns": {}, "info": {}}
+
+    def save(self):
+        """ Write the metadata, replacing the old one atomically."""
+        temp_file = self.meta_file.with_suffix(".tmp")
+        with open(temp_file, "w") as file:
+            json.dump(self.meta, file, indent=1, default=str)
+        os.replace(temp_file, self.meta_file)
+
+    def column_file(self, name):
+        """ Binary file of the column name."""
+        return self.path / f"{name}.bin"
+
+    def row_bytes(self, name):
+        """ Size in bytes of one row of the column."""
+        column = self.meta["columns"][name]
+        return np.dtype(column["dtype"]).itemsize * \
+            int(np.prod(column["shape"], dtype=int))
+
+    def drop_partial_rows(self):
+        """ Cut the rows written after the last metadata update."""
+        for name in self.meta["columns"]:
+            size = self.meta["num_rows"] * self.row_bytes(name)
+            with open(self.column_file(name), "ab") as file:
+                if file.tell() > size:
+                    file.truncate(size)
+
+    def truncate(self, num_rows):
+        """ Keep only the first num_rows rows."""
+        if num_rows < self.meta["num_rows"]:
+            self.meta["num_rows"] = num_rows
+            self.save()
+            self.drop_partial_rows()
+
+    def append(self, row):
+        """ Append one row.
+
+        Parameters
+        ----------
+        row: dictionary
+            Value of each column, scalar or array. The columns, their
+            shape and dtype are defined by the first row.
+        """
+        if self.mode == "r":
+            raise ValueError("Results store opened only for reading.")
+        columns = self.meta["columns"]
+        if not columns:
+            for name, value in row.items():
+                value = np.asarray(value)
+                columns[name] = {"dtype": value.dtype.str,
+                                 "shape": list(value.shape)}
+                # rows of an append that was never finished
+                self.column_file(name).write_bytes(b"")
+        if set(row) != set(columns):
+            raise ValueError(f"Expected the columns {sorted(columns)}, "
+                             f"got {sorted(row)}.")
+        # every column is checked before writing, a rejected row
+        # leaves no bytes in the files
+        values = {}
+        for name, column in columns.items():
+            value = np.asarray(row[name], dtype=column["dtype"])
+            if list(value.shape) != column["shape"]:
+                raise ValueError(f"Column {name} has shape "
+                                 f"{column['shape']}, got {value.shape}.")
+            values[name] = np.ascontiguousarray(value).tobytes()
+        for name, data in values.items():
+            with open(self.column_file(name), "ab") as file:
+                file.write(data)
+        self.meta["num_rows"] += 1
+        self.save()
+
+    def set_info(self, **info):
+        """ Add run information (time, parameters) to the metadata."""
+        self.meta["info"].update(info)
+        self.save()
+
+    @property
+    def info(self):
+        """ Run information of the metadata."""
+        return self.meta["info"]
+
+    @property
+    def columns(self):
+        """ Names of the columns."""
+        return list(self.meta["columns"])
+
+    def column(self, name):
+        """ Read only memory map of the column.
+
+        Returns
+        -------
+        array (num_rows, *row_shape)
+        """
+        column = self.meta["columns"][name]
+        shape = (self.meta["num_rows"], *column["shape"])
+        if not self.meta["num_rows"]:
+            return np.empty(shape, dtype=column["dtype"])
+        return np.memmap(self.column_file(name), dtype=column["dtype"],
+                         mode="r", shape=shape)
+
+    def read(self):
+        """ Memory maps of all the columns."""
+        return {name: self.column(name) for name in self.columns}
+
+    def __len__(self):
+        return self.meta["num_rows"]
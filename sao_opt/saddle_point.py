@@ -0,0 +1,100 @@
+""" Structured solver for the rbf saddle point system."""
+import numpy as np
+from scipy.linalg import (LinAlgError, cho_factor, cho_solve, lapack, lstsq,
+                          solve_triangular)
+
+
+class SaddlePointSolver:
+
+    """Null-space solver of [[Phi, P], [P^T, 0]] [lamb, gamma] = [f, g].
+
+    P = QR is factorized with Householder reflectors and the kernel
+    block is projected on the null space of P^T. For the cubic kernel
+    with linear tail the projected block is positive definite, so it
+    is factorized with Cholesky. If P is rank deficient or the
+    projected block is ill conditioned, the full system is solved by
+    least squares.
+    """
+
+    def __init__(self, phi, p_matrix, max_cond=1e12):
+        """
+        Parameters
+        ----------
+        phi: array (num_samples, num_samples)
+            Kernel matrix.
+        p_matrix: array (num_samples, num_poly)
+            Polynomial tail matrix.
+        max_cond: float
+            Largest condition number accepted for the Cholesky factor.
+
+        """
+        self.phi = np.asarray(phi, dtype=float)
+        self.p_matrix = np.asarray(p_matrix, dtype=float)
+        self.num_samples, self.num_poly = self.p_matrix.shape
+        self.max_cond = max_cond
+        self.cond = np.inf
+        self.fallback = False
+        self.full_matrix = None
+        self.factorize()
+
+    def apply_q(self, matrix, trans="N", side="L"):
+        """ Multiply by the orthogonal factor of P without forming it."""
+        shape = matrix.shape
+        if side == "L":
+            matrix = matrix.reshape(self.num_samples, -1)
+        lwork = max(1, 64 * max(matrix.shape))
+        result, _, info = lapack.dormqr(side, trans, self.qr_p, self.tau,
+                                        matrix, lwork)
+        if info != 0:
+            raise LinAlgError(f"dormqr failed with info={info}")
+        return result.reshape(shape)
+
+    def factorize(self):
+        """ Factorize the polynomial block and the projected kernel."""
+        num_poly = self.num_poly
+        self.qr_p, self.tau, _, info = lapack.dgeqrf(self.p_matrix)
+        self.r_mat = np.triu(self.qr_p[:num_poly])
+        diag_r = np.abs(np.diag(self.r_mat))
+        tol = np.finfo(float).eps * self.num_samples * diag_r.max()
+        if info != 0 or self.num_samples <= num_poly or \
+                diag_r.min() <= tol:
+            self.use_fallback()
+            return
+        # B = Q^T Phi Q
+        self.b_mat = self.apply_q(self.apply_q(self.phi, "T"), "N", "R")
+        try:
+            self.chol = cho_factor(self.b_mat[num_poly:, num_poly:],
+                                   lower=True)
+        except LinAlgError:
+            self.use_fallback()
+            return
+        diag_l = np.abs(np.diag(self.chol[0]))
+        self.cond = (diag_l.max() / diag_l.min()) ** 2
+        if self.cond > self.max_cond:
+            self.use_fallback()
+
+    def use_fallback(self):
+        """ Solve the full system by least squares."""
+        self.fallback = True
+        zeros = np.zeros((self.num_poly, self.num_poly))
+        self.full_matrix = np.block([[self.phi, self.p_matrix],
+                                     [self.p_matrix.T, zeros]])
+
+    def solve(self, rhs):
+        """ Solve the system for rhs (n + m,) or (n + m, k)."""
+        rhs = np.asarray(rhs, dtype=float)
+        if self.fallback:
+            return lstsq(self.full_matrix, rhs)[0]
+        num_poly = self.num_poly
+        q_rhs = self.apply_q(rhs[:self.num_samples], "T")
+        # P^T lamb = R^T u1 = g
+        u_1 = solve_triangular(self.r_mat, rhs[self.num_samples:],
+                               trans="T")
+        u_2 = cho_solve(self.chol, q_rhs[num_poly:] -
+                        self.b_mat[num_poly:, :num_poly].dot(u_1))
+        gamma = solve_triangular(
+            self.r_mat, q_rhs[:num_poly] -
+            self.b_mat[:num_poly, :num_poly].dot(u_1) -
+            self.b_mat[:num_poly, num_poly:].dot(u_2))
+        lamb = self.apply_q(np.concatenate((u_1, u_2)))
+        return np.concatenate((lamb, gamma))
@@ -1,4 +1,5 @@
 """ Join all the class for optimization. """
+from contextlib import nullcontext
 
 
 class Sequence:
@@ -6,7 +7,7 @@ class Sequence:
     """Main class of the framework."""
 
     def __init__(self, simulation, trust_region, surrogate, solver,
-                 converge, results):
+                 converge, results, profiler=None, checkpoint=None):
         """
         Parameters
         ----------
@@ -18,6 +19,10 @@ class Sequence:
             instance of the class TrustConstrSolver.
         strategy: TrustRegion()
             instance of the class TrustRegion.
+        profiler: SequenceProfiler()
+            Optional timers and counters of each iteration.
+        checkpoint: Checkpoint()
+            Optional periodic snapshot of the state.
 
         """
         self.simulation = simulation
@@ -26,23 +31,55 @@ class Sequence:
         self.solver = solver
         self.converge = converge
         self.results = results
+        self.profiler = profiler
+        self.checkpoint = checkpoint
+        if profiler is not None:
+            profiler.attach(self)
+
+    def phase(self, name):
+        """ Timer of the phase name, if the profiler is used."""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(name)
+
+    def resume(self):
+        """ Restore the state of the checkpoint, if there is one."""
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return False
+        self.checkpoint.restore(self)
+        if self.profiler is not None:
+            self.profiler.last = self.profiler.simulation_counters()
+        return True
 
     def run(self):
         """ Apply optimization sequence. """
+        if self.profiler is None:
+            self.iterate()
+        else:
+            with self.profiler.session():
+                self.iterate()
+        print(" Optimization is finish.!! \n")
+        print(f"Optimal value: {self.results.fob_star[-1]}")
+        print(f"Optimal x: {self.results.x_star[-1]}")
 
+    def iterate(self):
+        """ SAO iterations until convergence."""
         while not self.converge():
 
             # Update lower and upper
-            self.trust_region.update_bounds()
+            with self.phase("trust_region"):
+                self.trust_region.update_bounds()
             new_lb = self.trust_region.new_lower
             new_ub = self.trust_region.new_upper
             delta = self.trust_region.delta
 
             # Update samples
-            self.surrogate.doe(new_lb, new_ub, delta)
+            with self.phase("doe"):
+                self.surrogate.doe(new_lb, new_ub, delta)
 
             # New Surrogate
-            self.surrogate.update(self.simulation)
+            with self.phase("surrogate"):
+                self.surrogate.update(self.simulation)
 
             # New solver parameters
             self.solver.bound = [new_lb, new_ub]
@@ -50,19 +87,23 @@ class Sequence:
             self.solver.x_init = self.trust_region.x_center
 
             # Optimize
-            self.solver.maximize_npv()
+            with self.phase("subproblem"):
+                self.solver.maximize_npv()
 
             # Results update
             self.results.solver = self.solver
             self.results.surrogate = self.surrogate
             self.results.trust_region = self.trust_region
-            self.results.update()
+            with self.phase("results"):
+                self.results.update()
 
             # New center point and delta
-            self.trust_region.update_search_region(self.results)
+            with self.phase("trust_region"):
+                self.trust_region.update_search_region(self.results)
 
             # Update converge conditions
             self.converge.results = self.results
-        print(" Optimization is finish.!! \n")
-        print(f"Optimal value: {self.results.fob_star[-1]}")
-        print(f"Optimal x: {self.results.x_star[-1]}")
+            if self.profiler is not None:
+                self.profiler.end_iteration()
+            if self.checkpoint is not None:
+                self.checkpoint.update(self)
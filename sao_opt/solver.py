@@ -1,6 +1,9 @@
 """ Numerical Solver for the optimization problem."""
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from pyDOE import lhs
 from scipy.optimize import Bounds, LinearConstraint, minimize
+from scipy.spatial import distance
 
 
 class OptConstraints:
@@ -68,12 +71,35 @@ class TrustConstrSolver:
 
     """Trust region constraint algorith for scipy."""
 
-    def __init__(self, lcons=None):
+    def __init__(self, lcons=None, num_starts=1, max_workers=None,
+                 num_infill=1, min_spacing=0.05):
+        """
+        Parameters
+        ----------
+        lcons: LinearConstraint
+            Linear constraints of the problem.
+        num_starts: int
+            Number of starting points, 1 is a single start in x_init.
+        max_workers: int
+            Number of threads for the multi-start, None lets
+            ThreadPoolExecutor choose.
+        num_infill: int
+            Number of candidates proposed in each iteration.
+        min_spacing: float
+            Minimum distance between the candidates, as a fraction of
+            the trust region diagonal.
+
+        """
         self.lcons = lcons
+        self.num_starts = num_starts
+        self.max_workers = max_workers
+        self.num_infill = num_infill
+        self.min_spacing = min_spacing
         self._func = []
         self._x_init = []
         self._bound = []
         self.result = []
+        self.candidates = []
 
     @property
     def func(self):
@@ -104,16 +130,97 @@ class TrustConstrSolver:
     def bound(self, new_bound):
         self._bound = Bounds(*new_bound)
 
+    def jacobian(self):
+        """ Analytic gradient of func, None to use finite differences."""
+        return getattr(self.func, "gradient", None)
+
+    def minimize_from(self, x_start):
+        """ Run SLSQP from x_start."""
+        if self.lcons:
+            return minimize(self.func,
+                            x_start,
+                            method='SLSQP',
+                            jac=self.jacobian(),
+                            bounds=self.bound,
+                            constraints=self.lcons)
+        return minimize(self.func,
+                        x_start,
+                        method='SLSQP',
+                        jac=self.jacobian(),
+                        bounds=self.bound)
+
+    def start_points(self):
+        """ Starting points for the multi-start.
+
+        x_init, then the best samples of the surrogate inside the
+        bounds and, if they are not enough, LHS points.
+        """
+        lower, upper = self.bound.lb, self.bound.ub
+        starts = [np.asarray(self.x_init, dtype=float)]
+        samples = np.asarray(getattr(self.func, "input_vars", []))
+        if samples.ndim == 2 and len(samples):
+            values = np.asarray(self.func.output_vars)
+            inside = np.all((samples >= lower) & (samples <= upper), axis=1)
+            order = np.argsort(values[inside])
+            starts.extend(samples[inside][order])
+        starts = starts[:self.num_starts]
+        missing = self.num_starts - len(starts)
+        if missing > 0:
+            norm_points = lhs(len(lower), missing)
+            starts.extend(lower + (upper - lower) * norm_points)
+        return starts
+
+    def feasible(self, design_var, tol=1e-6):
+        """ Verify the bound and linear constraints."""
+        if np.any(design_var < self.bound.lb - tol) or \
+                np.any(design_var > self.bound.ub + tol):
+            return False
+        if self.lcons:
+            value = self.lcons.A.dot(design_var)
+            return bool(np.all(value >= self.lcons.lb - tol) and
+                        np.all(value <= self.lcons.ub + tol))
+        return True
+
+    def multi_start(self):
+        """ Run SLSQP from many points at the same time.
+
+        The best feasible result is kept in result and all the
+        feasible ones, sorted by value, in candidates.
+        """
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            results = list(executor.map(self.minimize_from,
+                                        self.start_points()))
+        results.sort(key=lambda res: float(np.squeeze(res.fun)))
+        self.candidates = [res for res in results if self.feasible(res.x)]
+        if self.candidates:
+            self.result = self.candidates[0]
+        else:
+            self.result = results[0]
+
     def maximize_npv(self):
         """ Solve the optimiziation problem."""
-        if self.lcons:
-            self.result = minimize(self.func,
-                                   self.x_init,
-                                   method='SLSQP',
-                                   bounds=self.bound,
-                                   constraints=self.lcons)
+        if self.num_starts > 1:
+            self.multi_start()
         else:
-            self.result = minimize(self.func,
-                                   self.x_init,
-                                   method='SLSQP',
-                                   bounds=self.bound)
+            self.result = self.minimize_from(self.x_init)
+            self.candidates = [self.result]
+
+    def infill_points(self):
+        """ Diverse candidates to be evaluated in the same batch.
+
+        The optimum is followed by the next multi-start optima that
+        are at least min_spacing away from the ones already chosen.
+
+        Returns
+        -------
+        array (num_points, dim), num_points <= num_infill.
+        """
+        points = [np.asarray(self.result.x, dtype=float)]
+        min_dist = self.min_spacing * np.linalg.norm(self.bound.ub -
+                                                     self.bound.lb)
+        for res in self.candidates:
+            if len(points) >= self.num_infill:
+                break
+            if distance.cdist([res.x], points).min() > min_dist:
+                points.append(res.x)
+        return np.array(points)
@@ -1,8 +1,10 @@
 """ Create surrogate model for SAO. """
 import numpy as np
 from scipy.interpolate import Rbf
+from scipy.linalg import lu_factor, lu_solve
 from scipy.spatial import distance
 from .doe import RandomDoE
+from .saddle_point import SaddlePointSolver
 
 
 class RadialBasisSurrogate():
@@ -82,18 +84,109 @@ class RadialBasisSurrogate():
         self.build_model()
 
 
+class BorderedSystem:
+
+    """Augmented rbf system that grows by bordering.
+
+    The unknowns are ordered as the base system followed by each
+    bordered block. A new block is eliminated through its Schur
+    complement, so adding k samples costs O(n^2 k) instead of a new
+    factorization of the whole matrix.
+    """
+
+    def __init__(self, phi, p_matrix):
+        self.base_size = sum(p_matrix.shape)
+        self.base = SaddlePointSolver(phi, p_matrix)
+        self.blocks = []
+
+    @property
+    def size(self):
+        """ Number of unknowns of the system."""
+        return self.base_size + sum(b_mat.shape[1]
+                                    for b_mat, _, _ in self.blocks)
+
+    def base_solve(self, rhs):
+        """ Solve the base system."""
+        return self.base.solve(rhs)
+
+    def solve(self, rhs):
+        """ Solve the bordered system for rhs (size,) or (size, k)."""
+        rhs = np.asarray(rhs, dtype=float)
+        sol = self.base_solve(rhs[:self.base_size])
+        for b_mat, x_mat, schur in self.blocks:
+            size = len(sol)
+            new = rhs[size:size + b_mat.shape[1]]
+            new = lu_solve(schur, new - b_mat.T.dot(sol))
+            sol = np.concatenate((sol - x_mat.dot(new), new))
+        return sol
+
+    def border(self, b_mat, c_mat):
+        """ Append the block [[A, B], [B^T, C]] to the system.
+
+        Parameters
+        ----------
+        b_mat: array (size, k)
+            Coupling between the current and the new unknowns.
+        c_mat: array (k, k)
+            Block of the new unknowns.
+        """
+        x_mat = self.solve(b_mat)
+        schur = lu_factor(c_mat - b_mat.T.dot(x_mat))
+        self.blocks.append((b_mat, x_mat, schur))
+
+
 class RbfPoly:
 
-    """Radial Basis with polynomial tail."""
+    """Radial Basis with polynomial tail.
 
-    def __init__(self, doe):
+    Every high fidelity sample is kept in an archive. In each update
+    the archive points inside (or near) the trust region are reused,
+    the DoE only completes the design and, when the previous samples
+    are still in the region, the new ones are appended to the system
+    by bordering instead of solving it from scratch.
+    """
+
+    def __init__(self, doe, reuse_margin=0.1, max_border=10, loo_tol=None,
+                 min_samples=None, batch_size=None):
+        """
+        Parameters
+        ----------
+        doe: RandomDoE()
+            Design of experiments of the trust region.
+        reuse_margin: float
+            Fraction of the trust region length added around it to
+            select the archive points.
+        max_border: int
+            Maximum number of bordered blocks before a new fit.
+        loo_tol: float
+            Tolerance of the leave-one-out error (relative to the
+            standard deviation of the samples). None always uses the
+            doe.num_samples points.
+        min_samples: int
+            Points of the first adaptive design, default dim + 2.
+        batch_size: int
+            Points added while the error is above loo_tol, default
+            dim / 4 (at least 2).
+        """
         self.doe = doe
+        self.reuse_margin = reuse_margin
+        self.max_border = max_border
+        self.loo_tol = loo_tol
+        self.min_samples = min_samples
+        self.batch_size = batch_size
+        self.cv_error = None
         self._input_vars = []
         self._output_vars = []
         self.num_samples = []
         self.dim = []
         self.lamb = []
         self.gamma = []
+        self.archive_x = None
+        self.archive_y = None
+        self.killed_x = None
+        self.model_index = []
+        self.system = None
+        self.base_samples = 0
 
     @property
     def input_vars(self):
@@ -149,32 +242,219 @@ class RbfPoly:
         zeros = np.zeros((self.dim + 1, ))
         return np.hstack((self.output_vars, zeros))
 
+    def solve_params(self):
+        """ Solve the system and split lambda and gamma.
+
+        The unknowns of the system are ordered as the base samples,
+        the polynomial tail and the bordered samples.
+        """
+        base = self.base_samples
+        tail = base + self.dim + 1
+        rhs = np.hstack((self.output_vars[:base], np.zeros(self.dim + 1),
+                         self.output_vars[base:]))
+        params = self.system.solve(rhs)
+        self.lamb = np.concatenate((params[:base], params[tail:]))
+        self.gamma = params[base:tail]
+
     def model(self):
         """ Solve the linear system."""
         self.samples_dim()
-        matrix_a = self.get_a_matrix()
-        matrix_rhs = self.get_rhs()
-        inv_a = np.linalg.pinv(matrix_a)
-        params = inv_a.dot(matrix_rhs)
-        self.lamb = params[:self.num_samples]
-        self.gamma = params[self.num_samples:]
+        self.system = BorderedSystem(self.get_phi(), self.get_p())
+        self.base_samples = self.num_samples
+        self.solve_params()
+
+    def border_model(self, new_points, new_values):
+        """ Append new samples to the current system."""
+        base = self.input_vars[:self.base_samples]
+        bordered = self.input_vars[self.base_samples:]
+        b_mat = np.vstack((
+            np.power(distance.cdist(base, new_points), 3),
+            np.hstack((new_points, np.ones((len(new_points), 1)))).T,
+            np.power(distance.cdist(bordered, new_points), 3)))
+        c_mat = np.power(distance.cdist(new_points, new_points), 3)
+        self.system.border(b_mat, c_mat)
+        self.input_vars = np.vstack((self.input_vars, new_points))
+        self.output_vars = np.hstack((self.output_vars, new_values))
+        self.samples_dim()
+        self.solve_params()
+
+    def add_to_archive(self, points, values, status=None, tol=1e-10):
+        """ Add high fidelity samples to the archive.
+
+        Points closer than tol to an archived one are ignored. Killed
+        runs have only an npv bound, their points are kept apart in
+        killed_x and never enter the model.
+        """
+        points = np.atleast_2d(points).astype(float)
+        values = np.atleast_1d(values).astype(float)
+        if status is not None:
+            killed = np.array(status, dtype=object) == "killed"
+            if killed.any():
+                self.killed_x = np.vstack(
+                    [points[killed]] if self.killed_x is None else
+                    (self.killed_x, points[killed]))
+            points, values = points[~killed], values[~killed]
+        if self.archive_x is None:
+            self.archive_x = np.empty((0, points.shape[1]))
+            self.archive_y = np.empty(0)
+        keep = []
+        for index, point in enumerate(points):
+            known = np.vstack((self.archive_x, points[keep]))
+            if not len(known) or distance.cdist([point], known).min() > tol:
+                keep.append(index)
+        self.archive_x = np.vstack((self.archive_x, points[keep]))
+        self.archive_y = np.hstack((self.archive_y, values[keep]))
+
+    def select_archive(self):
+        """ Indexes of the archive points near the trust region."""
+        if self.archive_x is None:
+            return np.array([], dtype=int)
+        lower = np.asarray(self.doe.min_values, dtype=float)
+        upper = np.asarray(self.doe.max_values, dtype=float)
+        margin = self.reuse_margin * (upper - lower)
+        inside = np.all((self.archive_x >= lower - margin) &
+                        (self.archive_x <= upper + margin), axis=1)
+        return np.flatnonzero(inside)
+
+    def new_samples(self, reused, num_new, tol=1e-10):
+        """ DoE samples farthest from the reused points (maximin).
+
+        The candidates closer than tol to a reused point are never
+        chosen, so fewer than num_new may be returned.
+        """
+        candidates = self.doe.samples
+        if num_new <= 0:
+            return candidates[:0]
+        if not len(reused):
+            return candidates[:num_new]
+        min_dist = distance.cdist(candidates, reused).min(axis=1)
+        chosen = []
+        for _ in range(min(num_new, len(candidates))):
+            best = int(np.argmax(min_dist))
+            if min_dist[best] <= tol:
+                break
+            chosen.append(best)
+            dist = distance.cdist(candidates, candidates[[best]]).ravel()
+            min_dist = np.minimum(min_dist, dist)
+        return candidates[chosen]
+
+    def fit(self, index):
+        """ Fit the model with the archive points of index.
+
+        If the points of the current model are all kept, the new
+        ones are appended by bordering.
+        """
+        current = list(self.model_index)
+        new = [i for i in index if i not in set(current)]
+        if self.system is not None and set(current) <= set(index) and \
+                len(self.system.blocks) < self.max_border:
+            if new:
+                self.border_model(self.archive_x[new], self.archive_y[new])
+            self.model_index = current + new
+        else:
+            self.input_vars = self.archive_x[index]
+            self.output_vars = self.archive_y[index]
+            self.model()
+            self.model_index = list(index)
+
+    def loo_errors(self):
+        """ Leave-one-out errors of the samples.
+
+        Rippa's formula e_i = lamb_i / (A^-1)_ii, with the columns of
+        A^-1 solved from the factorized (bordered) system, so there
+        is no new fit for each left out point.
+        """
+        base = self.base_samples
+        tail = base + self.dim + 1
+        rows = np.concatenate((np.arange(base),
+                               np.arange(tail, self.system.size)))
+        columns = np.arange(len(rows))
+        unit = np.zeros((self.system.size, len(rows)))
+        unit[rows, columns] = 1
+        diagonal = self.system.solve(unit)[rows, columns]
+        return np.divide(self.lamb, diagonal,
+                         out=np.full(len(rows), np.inf),
+                         where=diagonal != 0)
+
+    def loo_error(self):
+        """ RMS of the leave-one-out errors over the std of the
+        samples."""
+        scale = np.std(self.output_vars)
+        if scale == 0:
+            return 0.0
+        return np.sqrt(np.mean(self.loo_errors() ** 2)) / scale
+
+    def select_killed(self):
+        """ Points of killed runs near the trust region."""
+        if self.killed_x is None:
+            return np.empty((0, self.doe.dim))
+        lower = np.asarray(self.doe.min_values, dtype=float)
+        upper = np.asarray(self.doe.max_values, dtype=float)
+        margin = self.reuse_margin * (upper - lower)
+        inside = np.all((self.killed_x >= lower - margin) &
+                        (self.killed_x <= upper + margin), axis=1)
+        return self.killed_x[inside]
+
+    def add_samples(self, func, num_total):
+        """ Simulate new DoE points until the region has num_total.
+
+        If func has an evaluate method (Simulation), the status of
+        the runs is used to keep the killed ones out of the model.
+
+        Returns
+        -------
+        Number of simulated points.
+        """
+        reused = self.select_archive()
+        if len(reused):
+            reused_x = self.archive_x[reused]
+        else:
+            reused_x = np.empty((0, self.doe.dim))
+        # the points of killed runs are not sampled again
+        taken = np.vstack((reused_x, self.select_killed()))
+        new_points = self.new_samples(taken, num_total - len(reused))
+        if len(new_points):
+            evaluate = getattr(func, "evaluate", None)
+            if evaluate is None:
+                output, status = func(new_points), None
+            else:
+                output, status = evaluate(new_points)
+            self.add_to_archive(new_points, output, status)
+        return len(new_points)
 
     def update(self, func):
         """ Update the model.
 
+        With loo_tol, the design starts with min_samples points and
+        grows by batch_size (appended by bordering) until the
+        leave-one-out error is below loo_tol or the doe.num_samples
+        budget is spent.
+
         Parameters
         ----------
         func: method
             Function to evaluate the samples.
-        new_lb: array-like
-            Lower boundaries.
-        new_ub: array-like
-            Upper boundaries.
         """
-        output = func(self.doe.samples)
-        self.input_vars = self.doe.samples
-        self.output_vars = output
-        self.model()
+        budget = self.doe.num_samples
+        if self.loo_tol is None:
+            self.add_samples(func, budget)
+            self.fit(self.select_archive())
+            return
+        num_total = min(budget, self.min_samples or self.doe.dim + 2)
+        batch_size = self.batch_size or max(2, self.doe.dim // 4)
+        first = True
+        while True:
+            added = self.add_samples(func, num_total)
+            self.fit(self.select_archive())
+            self.cv_error = self.loo_error()
+            if self.cv_error <= self.loo_tol or \
+                    len(self.model_index) >= budget or \
+                    not (added or first):
+                # tolerance met, budget spent or no DoE points left
+                break
+            first = False
+            num_total = min(budget, max(num_total, len(self.model_index)) +
+                            batch_size)
 
     def __call__(self, new_points):
         """ Predict the value in new_points."""
@@ -188,3 +468,33 @@ class RbfPoly:
         matrix_x = np.hstack((new_points, np.ones((nsam, 1))))
         yest_2 = matrix_x.dot(self.gamma)
         return yest_1 + yest_2
+
+    def gradient(self, new_points):
+        """ Analytic gradient of the model in new_points.
+
+        d/dx ||x - x_i||^3 = 3 ||x - x_i|| (x - x_i)
+
+        Returns
+        -------
+        array (dim,) for one point or (num_points, dim).
+        """
+        points = np.atleast_2d(new_points)
+        weights = 3 * distance.cdist(points, self.input_vars) * self.lamb
+        grad = weights.sum(axis=1)[:, None] * points - \
+            weights.dot(self.input_vars) + self.gamma[:-1]
+        if np.ndim(new_points) == 1:
+            return grad[0]
+        return grad
+
+    def hessian(self, new_point):
+        """ Analytic hessian of the model in one point.
+
+        d2/dx2 ||x - x_i||^3 = 3 (r_i I + (x - x_i)(x - x_i)^T / r_i)
+        """
+        diff = np.asarray(new_point, dtype=float) - self.input_vars
+        dist = np.linalg.norm(diff, axis=1)
+        inv_dist = np.divide(self.lamb, dist, out=np.zeros_like(dist),
+                             where=dist > 0)
+        hess = (diff.T * inv_dist).dot(diff)
+        hess[np.diag_indices_from(hess)] += np.dot(self.lamb, dist)
+        return 3 * hess
@@ -1,13 +1,13 @@
 """ Write importante information in Results file."""
 import time
-import csv
+from .results_store import ResultsStore
 
 
 class WriteResults:
 
-    """Write results in results.csv"""
+    """Write the run information in the results store metadata."""
 
-    def __init__(self, time_spend, nfev, problem):
+    def __init__(self, time_spend, nfev, problem, path="results"):
         """
 
         Parameters
@@ -17,12 +17,14 @@ class WriteResults:
         nfev: int
             Number of high fidelity functions evaluations.
         problem: instance of OptimizationProblem
+        path: str
+            Folder of the results store.
 
         """
         self.time_spend = time_spend
         self.nfev = nfev
         self.problem = problem
-        self.writer = None
+        self.store = ResultsStore(path, mode="a")
         self.save_results()
 
     def time_in_hours(self):
@@ -30,32 +32,14 @@ class WriteResults:
 
         Returns
         -------
-        Stream with time in hours, minutes and seconds.
+        String with the time in hours, minutes and seconds.
         """
-        elap_time = time.strftime('%H:%M:%S', time.gmtime(self.time_spend))
-        self.writer.writerow([f"Time spend: {elap_time}"])
-
-    def write_opt_options(self):
-        """ Write opt options inside the results file."""
-        for key, value in self.problem.opt_param.items():
-            self.writer.writerow([key, value])
-        self.writer.writerow(["\n"])
-
-    def write_res_param(self):
-        """ Write opt options inside the results file."""
-        for key, value in self.problem.res_param.items():
-            self.writer.writerow([key, value])
-        self.writer.writerow(["\n"])
-
-    def write_nfev(self):
-        """ Write the number of high fidelity functions evaluations."""
-        self.writer.writerow([f"Number HF fev: {self.nfev}"])
+        return time.strftime('%H:%M:%S', time.gmtime(self.time_spend))
 
     def save_results(self):
         """ Save results."""
-        with open('results.csv', 'a') as csv_file:
-            self.writer = csv.writer(csv_file)
-            self.time_in_hours()
-            self.write_nfev()
-            self.write_res_param()
-            self.write_opt_options()
+        self.store.set_info(time_spend=self.time_spend,
+                            elapsed=self.time_in_hours(),
+                            nfev_hf=self.nfev,
+                            res_param=self.problem.res_param,
+                            opt_param=self.problem.opt_param)
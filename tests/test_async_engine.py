@@ -0,0 +1,74 @@
+""" Tests for the AsyncPyMex engine."""
+import time
+import pytest
+import numpy as np
+from PyMEX.utilits import AsyncPyMex, PyMEX
+
+
+@pytest.fixture(name="res_param")
+def fix_res_param():
+    """ Minimal reservoir parameters."""
+    return {"path": ".", "nb_prod": 1, "nb_inj": 1, "nb_cycles": 1,
+            "max_rate_prod": 100, "max_rate_inj": 100,
+            "time_concession": 3600, "type_time": 0}
+
+
+@pytest.fixture(name="engine")
+def fix_engine(res_param, tmp_path, monkeypatch):
+    """ Engine running 'sleep' instead of IMEX."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(PyMEX, "create_well_operation", lambda self: None)
+    monkeypatch.setattr(PyMEX, "rwd_file", lambda self: None)
+    monkeypatch.setattr(PyMEX, "simulator_command",
+                        lambda self: ["sleep", "0.3"])
+
+    def finish_run(self, log, procedure):
+        assert procedure.returncode == 0
+        self.npv = float(np.sum(self.controls))
+
+    monkeypatch.setattr(PyMEX, "finish_run", finish_run)
+    with AsyncPyMex(res_param, pool_size=4) as engine:
+        yield engine
+
+
+def test_map(engine):
+    """ The npv is returned in the order of the controls."""
+    controls = np.array([[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]])
+    npv = engine.map(controls)
+    assert np.allclose(npv, [0.3, 0.7, 1.1])
+
+
+def test_runs_concurrently(engine):
+    """ Four runs with four slots take about one run time."""
+    start = time.time()
+    engine.map(np.ones((4, 2)))
+    assert time.time() - start < 1.0
+
+
+def test_submit_while_running(engine):
+    """ New work is accepted while a batch is running."""
+    futures = engine.submit_batch(np.ones((2, 2)))
+    extra = engine.submit([1.0, 3.0])
+    assert not futures[0].done()
+    assert extra.result() == pytest.approx(4.0)
+    assert [future.result() for future in futures] == [2.0, 2.0]
+
+
+def test_timeout_penalty(engine, monkeypatch):
+    """ A hung run is killed and the batch goes on."""
+    engine.res_param.update({"sim_timeout": 0.5, "failure_penalty": -1.0})
+    commands = {1.0: ["sleep", "5"], 2.0: ["sleep", "0.1"]}
+    monkeypatch.setattr(PyMEX, "simulator_command",
+                        lambda self: commands[self.controls[0]])
+
+    def finish_run(self, log, procedure):
+        self.npv = float(np.sum(self.controls))
+        if self.status != "ok":
+            self.npv = self.res_param["failure_penalty"]
+
+    monkeypatch.setattr(PyMEX, "finish_run", finish_run)
+    start = time.time()
+    npv, status = engine.run_batch(np.array([[1.0], [2.0]]))
+    assert time.time() - start < 2.0
+    assert status == ["timeout", "ok"]
+    assert np.array_equal(npv, [-1.0, 2.0])
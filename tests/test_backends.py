@@ -0,0 +1,91 @@
+""" Tests for the simulator backends."""
+import time
+import pytest
+import numpy as np
+from PyMEX.utilits import TankProxy
+from sao_opt.backends import ProxyBackend, SimulatorBackend, create_backend
+from sao_opt.cache import SimulationCache
+from sao_opt.opt_problem import Simulation
+
+
+@pytest.fixture(name="res_param")
+def fix_res_param():
+    """ Reservoir parameters with 2 producers and 2 injectors."""
+    return {"prices": [126, 19, 6, 0.1], "nb_prod": 2, "nb_inj": 2,
+            "nb_cycles": 2, "max_rate_prod": 100, "max_rate_inj": 100,
+            "time_concession": 720, "type_time": 0,
+            "proxy": {"latency": 0.2}}
+
+
+@pytest.fixture(name="simulation")
+def fix_simulation(res_param, tmp_path):
+    """ Simulation with the proxy backend."""
+    simulation = Simulation()
+    simulation.res_param = res_param
+    simulation.opt_param.update({"backend": "proxy", "pool_size": 4})
+    simulation.cache = SimulationCache(res_param, tmp_path)
+    yield simulation
+    simulation.close()
+
+
+def test_proxy_mass_balance(res_param):
+    """ The liquid produced never exceeds the target rates."""
+    proxy = TankProxy(res_param)
+    controls = np.array([[1, 1, 0, 0, 1, 1, 0, 0],
+                         [1, 1, 1, 1, 0.5, 0.5, 0.5, 0.5]])
+    time_steps, production, pressure = proxy.simulate(controls)
+    assert time_steps[-1] == 720
+    assert production.shape == (2, 25, 4)
+    liquid = production[:, -1, 0] + production[:, -1, 1]
+    assert np.all(liquid <= [200 * 360 + 100 * 360, 200 * 360 + 200 * 360])
+    assert np.all(np.diff(production, axis=1) >= 0)
+    # Without injection the pressure only falls
+    assert pressure[0, 12] < pressure[0, 0]
+    assert np.all(production[0, :13, 3] == 0)
+
+
+def test_proxy_npv_vectorized(res_param):
+    """ The batch gives the same npv of each control alone."""
+    proxy = TankProxy(res_param)
+    controls = np.random.default_rng(3).random((5, 8))
+    npv = proxy.npv(controls)
+    assert npv.shape == (5,)
+    assert npv[2] == pytest.approx(proxy.npv(controls[2])[0])
+    assert proxy.npv(np.zeros((1, 8)))[0] == 0
+
+
+def test_proxy_backend_concurrent(res_param):
+    """ pool_size runs of the proxy take about one latency."""
+    backend = ProxyBackend(res_param, pool_size=4)
+    start = time.time()
+    npv, status = backend.evaluate(np.ones((4, 8)))
+    assert time.time() - start < 0.6
+    assert status == ["ok"] * 4
+    assert np.allclose(npv, npv[0])
+    backend.close()
+
+
+def test_unknown_backend(res_param):
+    """ An unknown name lists the registered backends."""
+    with pytest.raises(ValueError, match="proxy"):
+        create_backend("eclipse", res_param)
+
+
+def test_backend_needs_run_batch(res_param):
+    """ A backend without run_batch fails when it's created."""
+    class NoRuns(SimulatorBackend):
+        """Backend that forgot run_batch."""
+
+    with pytest.raises(TypeError, match="run_batch"):
+        NoRuns(res_param)
+
+
+def test_simulation_proxy(simulation):
+    """ Simulation runs and caches the proxy like the simulator."""
+    controls = np.random.default_rng(0).random((3, 8))
+    npv = simulation(controls)
+    assert npv == pytest.approx(TankProxy(simulation.res_param).npv(controls))
+    futures = simulation.submit(np.vstack((controls[:1], np.ones(8))))
+    assert futures[0].done()
+    assert futures[1].result() == pytest.approx(simulation(np.ones(8)))
+    assert simulation.num_simulations == 4
@@ -0,0 +1,125 @@
+""" Tests for the SimulationCache class."""
+import pytest
+import numpy as np
+from sao_opt.cache import SimulationCache
+from sao_opt.opt_problem import Simulation
+
+
+def sphere(design_var):
+    """ Sphere function."""
+    return np.sum(np.power(design_var, 2), axis=1)
+
+
+@pytest.fixture(name="res_param")
+def fix_res_param():
+    """ Reservoir parameters without template."""
+    return {"prices": [126, 19, 6, 0], "nb_cycles": 3}
+
+
+@pytest.fixture(name="cache")
+def fix_cache(res_param, tmp_path):
+    """ Create a instance of the SimulationCache."""
+    return SimulationCache(res_param, tmp_path, max_size=3)
+
+
+@pytest.fixture(name="simulation")
+def fix_simulation(res_param, tmp_path, monkeypatch):
+    """ Simulation with the sphere function as high fidelity."""
+    simulation = Simulation()
+    simulation.cache = SimulationCache(res_param, tmp_path)
+
+    def high_fidelity(controls):
+        simulation.num_simulations += len(controls)
+        simulation.status = ["ok"] * len(controls)
+        return sphere(controls)
+
+    monkeypatch.setattr(simulation, "high_fidelity", high_fidelity)
+    return simulation
+
+
+def test_lookup_empty(cache):
+    """ Nothing is found in an empty cache."""
+    values, found = cache.lookup(np.ones((2, 4)))
+    assert not found.any()
+    assert np.isnan(values).all()
+    assert cache.misses == 2
+
+
+def test_store_and_lookup(cache):
+    """ Stored values are returned."""
+    controls = np.array([[0.1, 0.2], [0.3, 0.4]])
+    cache.store(controls, [1.0, 2.0])
+    values, found = cache.lookup(controls)
+    assert found.all()
+    assert np.array_equal(values, [1.0, 2.0])
+    assert cache.hits == 2
+
+
+def test_quantized_key(cache):
+    """ Controls equal up to the decimals have the same key."""
+    assert cache.key([0.1, 0.2]) == cache.key([0.1 + 1e-9, 0.2])
+    assert cache.key([0.0]) == cache.key([-0.0])
+    assert cache.key([0.1, 0.2]) != cache.key([0.1, 0.3])
+
+
+def test_key_depends_on_res_param(cache, res_param, tmp_path):
+    """ Other reservoir parameters lead to other keys."""
+    res_param["nb_cycles"] = 2
+    other = SimulationCache(res_param, tmp_path)
+    assert other.key([0.1]) != cache.key([0.1])
+
+
+def test_lru_eviction(cache):
+    """ The least recently used entry is evicted."""
+    cache.store(np.array([[1.0], [2.0], [3.0]]), [1, 2, 3])
+    cache.lookup(np.array([[1.0]]))
+    cache.store(np.array([[4.0]]), [4])
+    _, found = cache.lookup(np.array([[1.0], [2.0], [3.0], [4.0]]))
+    assert np.array_equal(found, [True, False, True, True])
+
+
+def test_persistent(cache, res_param, tmp_path):
+    """ A new instance reads the entries from disk."""
+    cache.store(np.array([[0.5, 0.5]]), [7.0])
+    other = SimulationCache(res_param, tmp_path)
+    values, found = other.lookup(np.array([[0.5, 0.5]]))
+    assert found.all()
+    assert values[0] == 7.0
+
+
+def test_simulation_counts_only_misses(simulation):
+    """ num_simulations ignores the cached controls."""
+    controls = np.array([[0.1, 0.2], [0.3, 0.4], [0.1, 0.2]])
+    npv = simulation(controls)
+    assert np.allclose(npv, sphere(controls))
+    assert simulation.num_simulations == 2
+    assert simulation([0.3, 0.4]) == pytest.approx(0.25)
+    assert simulation.num_simulations == 2
+
+
+def test_failed_runs_not_cached(simulation, monkeypatch):
+    """ The penalty of a failed run is not stored in the cache."""
+    def high_fidelity(controls):
+        simulation.status = ["ok", "timeout"]
+        return np.array([1.0, 0.0])
+
+    monkeypatch.setattr(simulation, "high_fidelity", high_fidelity)
+    npv = simulation(np.array([[0.1], [0.2]]))
+    assert np.array_equal(npv, [1.0, 0.0])
+    _, found = simulation.cache.lookup(np.array([[0.1], [0.2]]))
+    assert np.array_equal(found, [True, False])
+
+
+def test_evaluate_status(simulation, monkeypatch):
+    """ Each control gets the status of its run, cached ones are ok."""
+    simulation(np.array([[0.3]]))
+
+    def high_fidelity(controls):
+        simulation.status = ["killed", "ok"]
+        return np.array([-1.0, 2.0])
+
+    monkeypatch.setattr(simulation, "high_fidelity", high_fidelity)
+    npv, status = simulation.evaluate(np.array([[0.2], [0.3], [0.1],
+                                                [0.2]]))
+    assert np.array_equal(npv, [2.0, 0.09, -1.0, 2.0])
+    assert status == ["ok", "ok", "killed", "ok"]
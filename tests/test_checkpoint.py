@@ -0,0 +1,100 @@
+""" Tests for the checkpoint and resume of the sequence."""
+from concurrent.futures import Future
+from types import SimpleNamespace
+import pytest
+import numpy as np
+from scipy.optimize import Bounds
+from sao_opt.checkpoint import Checkpoint
+from sao_opt.converge import Converge
+from sao_opt.doe import RandomDoE
+from sao_opt.results import Results
+from sao_opt.results_store import ResultsStore
+from sao_opt.sequence import Sequence
+from sao_opt.solver import TrustConstrSolver
+from sao_opt.surrogate import RbfPoly
+from sao_opt.trust_region import TrustRegion
+
+
+class RosenSimulation:
+
+    """ Rosenbrock function with the interface of Simulation."""
+
+    def __init__(self):
+        self.num_simulations = 0
+
+    def __call__(self, controls):
+        controls = np.atleast_2d(controls)
+        self.num_simulations += len(controls)
+        return np.sum(100 * (controls[:, 1:] - controls[:, :-1] ** 2) ** 2
+                      + (1 - controls[:, :-1]) ** 2, axis=1)
+
+    def submit(self, controls):
+        futures = []
+        for value in self(controls):
+            futures.append(Future())
+            futures[-1].set_result(value)
+        return futures
+
+
+def create_sequence(ite_max_sao, checkpoint):
+    """ New sequence for the Rosenbrock function in 3 dimensions."""
+    problem = SimpleNamespace(bounds=Bounds(-2 * np.ones((3, 1)),
+                                            2 * np.ones((3, 1))),
+                              delta=0.5, tol_opt=-1, tol_delta=1e-9,
+                              ite_max_sao=ite_max_sao)
+    simulation = RosenSimulation()
+    trust_region = TrustRegion(np.array([-1.0, 1.5, 0.5]), problem)
+    surrogate = RbfPoly(RandomDoE(trust_region.lower, trust_region.upper))
+    results = Results(surrogate, simulation)
+    return Sequence(simulation, trust_region, surrogate,
+                    TrustConstrSolver(), Converge(results, problem),
+                    results, checkpoint=checkpoint)
+
+
+@pytest.fixture(name="checkpoint")
+def fix_checkpoint(tmp_path, monkeypatch):
+    """ Checkpoint in each iteration, results store in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    return Checkpoint(tmp_path / "checkpoint.pkl")
+
+
+def test_resume_continues_run(checkpoint):
+    """ Stopping after 3 iterations and resuming gives the same run."""
+    np.random.seed(1)
+    full = create_sequence(6, None)
+    full.run()
+
+    np.random.seed(1)
+    create_sequence(3, checkpoint).run()
+    resumed = create_sequence(6, checkpoint)
+    assert resumed.resume()
+    assert resumed.results.count == [1, 2, 3]
+    assert resumed.simulation.num_simulations > 0
+    resumed.run()
+
+    assert resumed.results.count == full.results.count
+    assert np.allclose(resumed.results.fob_star, full.results.fob_star)
+    assert np.allclose(resumed.trust_region.x_center,
+                       full.trust_region.x_center)
+    assert resumed.simulation.num_simulations == \
+        full.simulation.num_simulations
+    store = ResultsStore("results", mode="r")
+    assert np.array_equal(store.column("count"), np.arange(1, 7))
+
+
+def test_no_checkpoint(checkpoint):
+    """ Without a file resume does nothing."""
+    sequence = create_sequence(2, checkpoint)
+    assert not sequence.resume()
+    assert not sequence.results.count
+
+
+def test_every(checkpoint):
+    """ The history after the last checkpoint is dropped on resume."""
+    checkpoint.every = 2
+    np.random.seed(0)
+    create_sequence(3, checkpoint).run()
+    resumed = create_sequence(3, checkpoint)
+    resumed.resume()
+    assert resumed.results.count == [1, 2]
+    assert len(ResultsStore("results")) == 2
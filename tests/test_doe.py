@@ -1,7 +1,10 @@
 """ Test the Design of Experiments classes."""
 import pytest
 import numpy as np
-from sao_opt.doe import RandomDoE
+from scipy.optimize import LinearConstraint
+from scipy.spatial.distance import pdist
+from sao_opt.doe import RandomDoE, ConstrainedDoE
+from sao_opt.lhs import optimized_lhs, random_lhs
 
 
 @pytest.fixture(name="doe")
@@ -69,3 +72,77 @@ def test_max_values_setter_false(doe):
     """ Test max values setter."""
     doe.max_values = np.array([0.7] * 24)
     assert not (doe.samples > 0.7).any()
+
+
+@pytest.fixture(name="linear")
+def fix_linear():
+    """ Platform limits of 2 cycles with 2 producers and 1 injector."""
+    matrix = np.array([[1, 1, 0, 0, 0, 0], [0, 0, 1, 0, 0, 0],
+                       [0, 0, 0, 1, 1, 0], [0, 0, 0, 0, 0, 1]])
+    return LinearConstraint(matrix, np.zeros(4), [1.0, 0.6, 1.0, 0.6])
+
+
+def test_constrained_samples(linear):
+    """ All the samples are feasible and inside the bounds."""
+    np.random.seed(0)
+    doe = ConstrainedDoE(np.full(6, 0.2), np.full(6, 0.9), linear)
+    doe.create_samples()
+    assert doe.samples.shape == (13, 6)
+    values = doe.samples.dot(linear.A.T)
+    assert np.all(values <= linear.ub + 1e-9)
+    assert np.all((doe.samples >= 0.2) & (doe.samples <= 0.9))
+
+
+def test_constrained_maximin(linear):
+    """ The maximin sweeps spread the projected points."""
+    np.random.seed(0)
+    doe = ConstrainedDoE(np.full(6, 0.2), np.full(6, 0.9), linear)
+    matrix, rhs = doe.inequalities()
+    center = doe.center(matrix, rhs)
+    projected = doe.project(doe.determine_plan_points(doe.lhs_points()),
+                            center, matrix, rhs)
+    refined = doe.refine(projected.copy(), matrix, rhs,
+                         np.random.default_rng(0))
+    assert pdist(refined).min() > pdist(projected).min()
+    assert np.all(refined.dot(linear.A.T) <= linear.ub + 1e-9)
+
+
+def test_constrained_without_linear():
+    """ Without constraints the samples are the LHS of the box."""
+    doe = ConstrainedDoE(np.zeros(3), np.ones(3))
+    doe.create_samples()
+    assert doe.samples.shape == (7, 3)
+
+
+def test_optimized_lhs():
+    """ Latin design, better maximin than a random LHS, cached by
+    seed."""
+    points = optimized_lhs(10, 21, seed=3)
+    strata = np.floor(points * 21).astype(int)
+    assert all(np.array_equal(np.sort(column), np.arange(21))
+               for column in strata.T)
+    random = random_lhs(10, 21, np.random.default_rng(3))
+    assert pdist(points).min() > pdist(random).min()
+    assert optimized_lhs(10, 21, seed=3) is points
+    assert not np.array_equal(optimized_lhs(10, 21, seed=4), points)
+
+
+def test_seeded_doe():
+    """ The same seed gives the same normalized design."""
+    first = RandomDoE(np.zeros(4), np.ones(4), seed=1)
+    second = RandomDoE(np.ones(4), np.full(4, 3.0), seed=1)
+    first.create_samples()
+    second.create_samples()
+    assert np.allclose(second.samples, 1 + 2 * first.samples)
+
+
+def test_constrained_seed(linear):
+    """ A seeded design doesn't depend on the global generator."""
+    designs = []
+    for global_seed in (0, 1):
+        np.random.seed(global_seed)
+        doe = ConstrainedDoE(np.full(6, 0.2), np.full(6, 0.9), linear,
+                             seed=5)
+        doe.create_samples()
+        designs.append(doe.samples)
+    assert np.array_equal(designs[0], designs[1])
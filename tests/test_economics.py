@@ -0,0 +1,82 @@
+""" Tests for the BatchNPV class."""
+import pytest
+import numpy as np
+from PyMEX.utilits import BatchNPV
+from PyMEX.utilits.economics import discount_factors
+
+
+def legacy_npv(production, time, prices):
+    """ Former PyMEX.net_present_value of one run."""
+    oil_price, water_prod_cost, water_inj_cost, discount_rate = prices
+    dif_volume = [np.diff(volume) for volume in production.T]
+    cash_flows = dif_volume[0] * oil_price - \
+        dif_volume[1] * water_prod_cost - dif_volume[3] * water_inj_cost
+    cash_flows = np.insert(cash_flows, 0, 0)
+    periodic_rate = ((1 + discount_rate) ** (1 / 365)) - 1
+    tax = 1 / np.power((1 + periodic_rate), time)
+    return np.sum(np.multiply(cash_flows, tax.T)) * (-1e-6)
+
+
+@pytest.fixture(name="production")
+def fix_production():
+    """ Cumulative production of 5 runs."""
+    rng = np.random.default_rng(0)
+    return np.cumsum(rng.uniform(0, 1e4, (5, 121, 4)), axis=1)
+
+
+@pytest.fixture(name="time")
+def fix_time():
+    """ Time steps of 30 days."""
+    return np.arange(0, 3630, 30.0)
+
+
+def test_npv_equal_legacy(production, time):
+    """ Same npv of the former implementation."""
+    prices = [126, 19, 6, 0.1]
+    npv = BatchNPV(prices).npv(production, time)
+    assert npv.shape == (1, 5)
+    for run, value in zip(production, npv[0]):
+        true = legacy_npv(run, time.reshape(-1, 1), prices)
+        assert value == pytest.approx(true)
+
+
+def test_npv_scenarios(production, time):
+    """ One npv for each price scenario and run."""
+    prices = np.array([[126, 19, 6, 0.1], [60, 19, 6, 0.1],
+                       [126, 19, 6, 0.0]])
+    npv = BatchNPV(prices).npv(production, time)
+    assert npv.shape == (3, 5)
+    for scenario, price in enumerate(prices):
+        assert np.allclose(npv[scenario],
+                           BatchNPV(price).npv(production, time)[0])
+
+
+def test_npv_time_per_run(production, time):
+    """ Each run can have its own time grid."""
+    times = np.tile(time, (5, 1))
+    npv = BatchNPV([126, 19, 6, 0.1])
+    assert np.allclose(npv.npv(production, times),
+                       npv.npv(production, time))
+
+
+def test_discount_cache(time):
+    """ Discount factors are computed once per grid and rate."""
+    first = discount_factors(time, [0.1])
+    assert discount_factors(time.copy(), [0.1]) is first
+    assert first[0, 0] == 1
+    assert np.all(discount_factors(time, [0.0]) == 1)
+
+
+def test_bound(production, time):
+    """ The bound is never below the npv and it's exact when the oil
+    is at the platform capacity with no water."""
+    npv = BatchNPV([126, 19, 6, 0.1])
+    full = npv.npv(production, time)
+    for stop in (1, 60, 120):
+        bound = npv.bound(production[:, :stop + 1], time[:stop + 1],
+                          time[-1], 1e4 / 30)
+        assert np.all(bound <= full + 1e-9)
+    plateau = np.zeros((1, len(time), 4))
+    plateau[0, :, 0] = 100 * time
+    bound = npv.bound(plateau[:, :61], time[:61], time[-1], 100)
+    assert bound == pytest.approx(npv.npv(plateau, time))
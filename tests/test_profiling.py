@@ -0,0 +1,91 @@
+""" Tests for the instrumentation of the sequence."""
+import json
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+import pytest
+import numpy as np
+from scipy.optimize import Bounds
+from sao_opt.converge import Converge
+from sao_opt.doe import RandomDoE
+from sao_opt.profiling import PhaseTimer, SequenceProfiler
+from sao_opt.results import Results
+from sao_opt.sequence import Sequence
+from sao_opt.solver import TrustConstrSolver
+from sao_opt.surrogate import RbfPoly
+from sao_opt.trust_region import TrustRegion
+
+
+class SphereSimulation:
+
+    """ Sphere function with the interface of Simulation."""
+
+    def __init__(self):
+        self.num_simulations = 0
+        self.cache = None
+
+    def high_fidelity(self, controls):
+        self.num_simulations += len(controls)
+        return np.sum(controls ** 2, axis=1)
+
+    def submit(self, controls):
+        futures = []
+        for value in self.high_fidelity(np.atleast_2d(controls)):
+            futures.append(Future())
+            futures[-1].set_result(value)
+        return futures
+
+    def __call__(self, controls):
+        return self.high_fidelity(np.atleast_2d(controls))
+
+
+@pytest.fixture(name="sequence")
+def fix_sequence(tmp_path, monkeypatch):
+    """ Three iterations on the sphere function with the profiler."""
+    monkeypatch.chdir(tmp_path)
+    np.random.seed(0)
+    dim = 3
+    problem = SimpleNamespace(bounds=Bounds(-np.ones((dim, 1)),
+                                            np.ones((dim, 1))),
+                              delta=0.5, tol_opt=1e-5, tol_delta=1e-3,
+                              ite_max_sao=3)
+    simulation = SphereSimulation()
+    trust_region = TrustRegion(np.full(dim, 0.8), problem)
+    surrogate = RbfPoly(RandomDoE(trust_region.lower, trust_region.upper))
+    results = Results(surrogate, simulation)
+    profiler = SequenceProfiler(str(tmp_path / "profile.jsonl"),
+                                use_cprofile=True,
+                                profile_file=str(tmp_path / "profile.prof"))
+    return Sequence(simulation, trust_region, surrogate,
+                    TrustConstrSolver(), Converge(results, problem),
+                    results, profiler)
+
+
+def test_nested_phases():
+    """ The time of a nested phase is not counted in the outer one."""
+    timer = PhaseTimer()
+    with timer.phase("outer"):
+        with timer.phase("inner"):
+            time.sleep(0.05)
+    assert timer.totals["inner"] >= 0.05
+    assert timer.totals["outer"] < 0.01
+    assert timer.calls == {"outer": 1, "inner": 1}
+
+
+def test_iteration_log(sequence, tmp_path):
+    """ One JSON record for each iteration, next to the results."""
+    sequence.run()
+    with open(tmp_path / "profile.jsonl") as log:
+        records = [json.loads(line) for line in log]
+    assert [record["iteration"] for record in records] == [1, 2, 3]
+    assert (tmp_path / "results" / "metadata.json").is_file()
+    assert (tmp_path / "profile.prof").is_file()
+    first = records[0]
+    assert {"doe", "surrogate", "subproblem", "results",
+            "simulation"} <= set(first["phases"])
+    # 2 * dim + 1 samples, x_star and x_center
+    assert first["counters"]["simulations"] == 9
+    assert first["counters"]["surrogate_calls"] > 0
+    assert first["calls"]["simulation"] >= 2
+    total = sum(record["counters"]["simulations"] for record in records)
+    assert total == sequence.simulation.num_simulations
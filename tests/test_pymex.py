@@ -0,0 +1,408 @@
+""" Tests for the PyMEX file manipulation."""
+import os
+import re
+import sys
+import time
+import subprocess
+from unittest.mock import Mock
+import pytest
+import numpy as np
+from PyMEX.utilits import PyMEX, ManiParam, ParallelPyMex
+from PyMEX.utilits.proxy import TankProxy
+from PyMEX.utilits.restart import prefix_groups
+from PyMEX.utilits.template_cache import TemplateCache
+from PyMEX.utilits.rwo_reader import read_rwo, rwo_columns
+from PyMEX.utilits.sr3_reader import Sr3Reader
+from PyMEX.utilits.scratch import ScratchDir
+
+
+@pytest.fixture(name="res_param")
+def fix_res_param():
+    """ Reservoir parameters with 2 producers and 1 injector."""
+    return {"path": ".", "nb_prod": 2, "nb_inj": 1, "nb_cycles": 3,
+            "max_rate_prod": 100, "max_rate_inj": 50,
+            "time_concession": 3600, "type_time": 0}
+
+
+@pytest.fixture(name="model")
+def fix_model(res_param):
+    """ PyMEX instance with known controls."""
+    controls = np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
+    return PyMEX(controls, res_param)
+
+
+def test_include_operation_time_steps(model):
+    """ One *TIME for each 30 days step."""
+    content = model.include_operation()
+    assert content.count("*TIME ") == 120
+    assert content.startswith("**---")
+    assert "*TIME 30\n*TIME 60\n" in content
+
+
+def test_include_operation_cycles(model):
+    """ One *ALTER block for each cycle with the rates."""
+    content = model.include_operation()
+    assert content.count("*ALTER 'PROD1' 'PROD2'") == 3
+    assert content.count("*ALTER 'INJECT1'") == 3
+    assert "**TIME 0\n" in content
+    assert "*TIME 1200\n**---" in content
+    assert "\n40.0 50.0\n" in content
+    assert "\n45.0\n" in content
+
+
+def test_create_well_operation(model, tmp_path):
+    """ The schedule replaces the WELL_INC marker of the template."""
+    model.res_param.update({"path": "PyMEX/reservoir_tpl",
+                            "template": "Egg_ham_3.tpl", "type_opera": 1})
+    model.run_path = tmp_path
+    model.basename = model.cmgfile("rank0")
+    model.create_well_operation()
+    with open("PyMEX/reservoir_tpl/Egg_ham_3.tpl") as tpl:
+        template = tpl.read()
+    operation = model.include_operation() + "*TIME 3600\n*STOP"
+    true = re.sub(r"[\W][\W]WELL_INC", operation, template)
+    with open(model.basename["dat"]) as dat:
+        assert dat.read() == true
+
+
+def test_template_cache(tmp_path):
+    """ Templates are read once and reloaded when modified."""
+    cache = TemplateCache()
+    tpl_name = tmp_path / "model.tpl"
+    tpl_name.write_text("head\n$$WELL_INC\ntail")
+    parts = cache.data_template(tpl_name)
+    assert parts == ["head\n", "\ntail"]
+    assert cache.data_template(tpl_name) is parts
+    tpl_name.write_text("new head\n**WELL_INC\ntail")
+    os.utime(tpl_name, ns=(0, os.stat(tpl_name).st_mtime_ns + 10**9))
+    assert cache.data_template(tpl_name) == ["new head\n", "\ntail"]
+
+
+def test_read_rwo(tmp_path):
+    """ Columns are views of one Fortran ordered table."""
+    path = tmp_path / "rank0.rwo"
+    table = np.arange(36.0).reshape(3, 12)
+    np.savetxt(path, table, header="\n".join(["header"] * 6), comments="")
+    content = read_rwo(path)
+    assert content.flags.f_contiguous
+    assert np.array_equal(content, table[:, :10])
+    columns = rwo_columns(content)
+    assert np.array_equal(columns.time, table[:, [0]])
+    assert np.array_equal(columns.production, table[:, 1:5])
+    assert np.array_equal(columns.wells_rate, table[:, 5:9])
+    assert np.array_equal(columns.average_pressure, table[:, [9]])
+    assert np.shares_memory(columns.production, content)
+
+
+@pytest.mark.filterwarnings("ignore:loadtxt")
+def test_read_rwo_empty(tmp_path):
+    """ A report without data raises ValueError."""
+    path = tmp_path / "rank0.rwo"
+    path.write_text("header\n" * 6)
+    with pytest.raises(ValueError):
+        read_rwo(path)
+
+
+def write_sr3(path, days):
+    """ Synthetic .sr3 file with the layout read by Sr3Reader."""
+    h5py = pytest.importorskip("h5py")
+    num_times = len(days)
+    master = np.zeros(num_times + 1, dtype=[("Index", "i4"),
+                                            ("Offset in days", "f8")])
+    master["Index"] = np.arange(num_times + 1)
+    master["Offset in days"] = np.hstack((-1, days))
+    groups = np.zeros((num_times, 4, 2))
+    groups[:, 0, 0] = np.cumsum(np.full(num_times, 10.0))
+    groups[:, 1, 0] = np.cumsum(np.full(num_times, 2.0))
+    groups[:, 1, 1] = np.cumsum(np.full(num_times, 5.0))
+    groups[:, 2, 0] = 10.0
+    groups[:, 3, :] = [[12.0, 5.0]] * num_times
+    with h5py.File(path, "w") as sr3:
+        sr3["General/MasterTimeTable"] = master
+        sr3["TimeSeries/GROUPS/Data"] = groups
+        sr3["TimeSeries/GROUPS/Timesteps"] = np.arange(1, num_times + 1)
+        sr3["TimeSeries/GROUPS/Origins"] = [b"FIELD-PRO", b"FIELD-INJ"]
+        sr3["TimeSeries/GROUPS/Variables"] = [
+            b"OILVOLSC", b"WATVOLSC", b"OILRATSC", b"LIQRATSC"]
+        sr3["TimeSeries/SECTORS/Data"] = np.full((2, 1, 1), 300.0)
+        sr3["TimeSeries/SECTORS/Timesteps"] = [1, num_times]
+        sr3["TimeSeries/SECTORS/Origins"] = [b"FIELD"]
+        sr3["TimeSeries/SECTORS/Variables"] = [b"PAVG"]
+
+
+def test_sr3_reader(tmp_path):
+    """ Columns are read in the layout of the .rwo report."""
+    path = tmp_path / "rank0.sr3"
+    write_sr3(path, [0.0, 30.0, 60.0])
+    columns = [("GROUPS", "FIELD-PRO", "OILVOLSC"),
+               ("GROUPS", "FIELD-PRO", "WATVOLSC"),
+               ("GROUPS", "FIELD-INJ", "WATVOLSC"),
+               ("SECTORS", "FIELD", "PAVG")]
+    table = Sr3Reader(path, columns).read()
+    assert table.flags.f_contiguous
+    assert np.array_equal(table[:, 0], [0, 30, 60])
+    assert np.array_equal(table[:, 1], [10, 20, 30])
+    assert np.array_equal(table[:, 2], [2, 4, 6])
+    assert np.array_equal(table[:, 3], [5, 10, 15])
+    assert np.array_equal(table[:, 4], [300, 300, 300])
+
+
+def test_get_production_sr3(model, tmp_path):
+    """ The sr3 backend does not call report.exe."""
+    model.res_param["results_backend"] = "sr3"
+    model.res_param["sr3_columns"] = [
+        ("GROUPS", "FIELD-PRO", "OILVOLSC"),
+        ("GROUPS", "FIELD-PRO", "WATVOLSC"),
+        ("GROUPS", "FIELD-PRO", "OILRATSC"),
+        ("GROUPS", "FIELD-INJ", "WATVOLSC"),
+        ("GROUPS", "FIELD-PRO", "OILRATSC"),
+        ("GROUPS", "FIELD-PRO", "OILRATSC"),
+        ("GROUPS", "FIELD-PRO", "LIQRATSC"),
+        ("GROUPS", "FIELD-INJ", "LIQRATSC"),
+        ("SECTORS", "FIELD", "PAVG")]
+    model.run_path = tmp_path
+    model.basename = model.cmgfile("rank0")
+    write_sr3(model.basename["sr3"], [0.0, 30.0, 60.0])
+    procedure = Mock(returncode=0)
+    model.get_production(None, procedure)
+    assert np.array_equal(model.time, [[0], [30], [60]])
+    assert np.array_equal(model.production[:, 3], [5, 10, 15])
+    assert np.array_equal(model.average_pressure, [[300]] * 3)
+
+
+def test_scratch_unique(tmp_path):
+    """ Each worker directory is unique and removed at the end."""
+    first = ScratchDir(tmp_path)
+    second = ScratchDir(tmp_path)
+    assert first.path != second.path
+    assert first.path.parent == tmp_path
+    first.cleanup()
+    assert not first.path.exists()
+    assert second.path.exists()
+
+
+def test_scratch_clean_up_truncate(model, tmp_path):
+    """ clean_up truncates the files of the run in the scratch."""
+    scratch = ScratchDir(tmp_path)
+    model.use_scratch(scratch)
+    assert model.run_path == scratch.path
+    with open(model.basename["dat"], "w") as dat:
+        dat.write("*RUN")
+    model.clean_up()
+    assert os.path.getsize(model.basename["dat"]) == 0
+    assert not os.path.exists(model.basename["rwo"])
+
+
+@pytest.fixture(name="sleeper")
+def fix_sleeper(model, tmp_path, monkeypatch):
+    """ Model running 'sleep' instead of IMEX."""
+    model.run_path = tmp_path
+    model.basename = model.cmgfile("rank0")
+    model.res_param.update({"sim_timeout": 0.2, "failure_penalty": 99.0})
+    model.timeout = 0.2
+    monkeypatch.setattr(model, "simulator_command",
+                        lambda: ["sleep", "5"])
+    return model
+
+
+def test_run_imex_timeout(sleeper):
+    """ A hung run is killed and gets the penalty npv."""
+    start = time.time()
+    sleeper.run_imex()
+    sleeper.net_present_value()
+    assert time.time() - start < 2.0
+    assert sleeper.status == "timeout"
+    assert sleeper.npv == 99.0
+    assert np.array_equal(sleeper.time.ravel(), sleeper.time_steps())
+    assert not sleeper.production.any()
+
+
+def test_run_imex_retry(sleeper, monkeypatch):
+    """ A failed run is repeated up to sim_retries times."""
+    commands = iter([["false"], ["sleep", "5"], ["true"]])
+    monkeypatch.setattr(sleeper, "simulator_command",
+                        lambda: next(commands))
+    monkeypatch.setattr(sleeper, "read_report", lambda: None)
+    monkeypatch.setattr(ManiParam, "check_call", Mock())
+    sleeper.retries = 2
+    sleeper.run_imex()
+    assert sleeper.status == "ok"
+    assert next(commands, None) is None
+
+
+def test_prefix_groups(res_param):
+    """ Groups by the first cycle, sharing the equal leading cycles."""
+    cycle = [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6], [0.7, 0.8, 0.9]]
+    controls = np.array([
+        np.ravel([cycle[0], cycle[1], cycle[2]]),
+        np.ravel([cycle[0], cycle[1], cycle[0]]),
+        np.ravel([cycle[1], cycle[1], cycle[2]]),
+        np.ravel([cycle[0], cycle[1], cycle[1]])])
+    groups = prefix_groups(controls, res_param)
+    assert len(groups) == 1
+    members, num_cycles = groups[0]
+    assert np.array_equal(members, [0, 1, 3])
+    assert num_cycles == 2
+    controls[1, 3] = 0.41
+    assert prefix_groups(controls, res_param)[0][1] == 1
+    res_param["type_time"] = 1
+    assert prefix_groups(controls, res_param) == []
+
+
+def test_restart_data_file(model, tmp_path):
+    """ Prefix runs stop with a restart record, the others start
+    from it."""
+    model.res_param.update({"path": "PyMEX/reservoir_tpl",
+                            "template": "Egg_ham_3.tpl", "type_opera": 1})
+    model.run_path = tmp_path
+    model.basename = model.cmgfile("rank0")
+    assert model.supports_restart()
+    model.stop_at(2400)
+    model.create_well_operation()
+    with open(model.basename["dat"]) as dat:
+        content = dat.read()
+    assert content.rstrip().endswith(
+        "*TIME 2370\n*WRST *TIME\n*TIME 2400\n*STOP")
+    assert "**RESTART_INC" in content
+    model.stop_time = None
+    model.use_restart("/scratch/prefix0.irf", 2400)
+    model.create_well_operation()
+    with open(model.basename["dat"]) as dat:
+        content = dat.read()
+    assert "*FILENAMES *INDEX-IN '/scratch/prefix0.irf'\n*RESTART\n" \
+        "*RESTIME 2400\n" in content
+    assert "RESTART_INC" not in content
+    assert content.rstrip().endswith("*TIME 3600\n*STOP")
+
+
+def test_pool_restart_prefix(res_param, tmp_path, monkeypatch):
+    """ Each group runs its prefix once and the members restart."""
+    res_param.update({"path": "PyMEX/reservoir_tpl",
+                      "template": "Egg_ham_3.tpl", "restart_prefix": True,
+                      "scratch_root": str(tmp_path)})
+    prefixes, restarts = [], {}
+
+    def run_prefix(self):
+        prefixes.append(self.stop_time)
+        return True
+
+    def call_pymex(self):
+        restarts[float(self.controls[-1])] = self.restart
+        self.npv = float(self.controls[-1])
+
+    monkeypatch.setattr(PyMEX, "run_prefix", run_prefix)
+    monkeypatch.setattr(PyMEX, "call_pymex", call_pymex)
+    controls = np.tile(np.linspace(0.1, 0.9, 9), (3, 1))
+    controls[:, -1] = [0.1, 0.2, 0.3]
+    controls[2, 0] = 0.5
+    model = ParallelPyMex(controls, res_param)
+    assert np.allclose(model.pool_pymex(), [0.1, 0.2, 0.3])
+    assert model.status == ["ok"] * 3
+    assert prefixes == [2400]
+    assert restarts[0.1][1] == 2400
+    assert restarts[0.1] == restarts[0.2]
+    assert restarts[0.1][0].endswith("prefix0.irf")
+    assert restarts[0.3] is None
+
+
+@pytest.mark.parametrize("output", ["full", "continued", "counted"])
+def test_restart_npv_equals_full_run(output, res_param, tmp_path,
+                                     monkeypatch):
+    """ A restarted member has the npv of the same control run from
+    day 0, with any form of the restarted output.
+
+    The proxy gives the production of the runs: the restarted output
+    starts at day 0 (full) or at *RESTIME, with the volumes counted
+    from day 0 (continued) or from the restart (counted).
+    """
+    res_param.update({"path": "PyMEX/reservoir_tpl",
+                      "template": "Egg_ham_3.tpl", "type_opera": 1,
+                      "prices": [126, 19, 6, 0.1],
+                      "scratch_root": str(tmp_path)})
+    restarted = []
+
+    def read_report(self):
+        run_time, production, pressure = TankProxy(self.res_param).simulate(
+            self.controls[None])
+        production, pressure = production[0], pressure[0]
+        if self.stop_time is not None:
+            keep = run_time <= self.stop_time
+        elif self.restart is not None and output != "full":
+            restarted.append(self.restart[1])
+            keep = run_time >= self.restart[1]
+            if output == "counted":
+                production = production - production[keep][0]
+        else:
+            keep = run_time >= 0
+        self.time = run_time[keep].reshape(-1, 1)
+        self.production = production[keep]
+        self.wells_rate = np.zeros((keep.sum(), 4))
+        self.average_pressure = pressure[keep].reshape(-1, 1)
+
+    monkeypatch.setattr(PyMEX, "simulator_command", lambda self: ["true"])
+    monkeypatch.setattr(PyMEX, "read_report", read_report)
+    monkeypatch.setattr(ManiParam, "check_call", Mock())
+    controls = np.tile(np.linspace(0.1, 0.9, 9), (3, 1))
+    controls[:, -3:] = [[0.1, 0.9, 0.2], [0.9, 0.1, 0.8], [0.5, 0.5, 0.5]]
+    full = ParallelPyMex(controls, dict(res_param)).pool_pymex()
+    res_param["restart_prefix"] = True
+    model = ParallelPyMex(controls, res_param)
+    assert np.allclose(model.pool_pymex(), full)
+    assert model.status == ["ok"] * 3
+    if output != "full":
+        assert restarted == [2400] * 3
+
+
+def test_partial_production_in_progress(sleeper, capsys):
+    """ The .sr3 open for writing by another process is read, and a
+    failed read is reported once."""
+    path = sleeper.basename["sr3"]
+    write_sr3(path, [0.0, 30.0, 60.0])
+    sleeper.res_param["sr3_columns"] = [
+        ("GROUPS", "FIELD-PRO", "OILVOLSC")] * 4 + [
+        ("GROUPS", "FIELD-PRO", "OILRATSC")] * 4 + [
+        ("SECTORS", "FIELD", "PAVG")]
+    writer = subprocess.Popen(
+        [sys.executable, "-c", "import sys, time, h5py\n"
+         f"sr3 = h5py.File({str(path)!r}, 'a')\n"
+         "print('open', flush=True)\ntime.sleep(10)"],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        assert writer.stdout.readline().strip() == "open"
+        run_time, production = sleeper.partial_production()
+    finally:
+        writer.kill()
+        writer.wait()
+    assert np.array_equal(run_time, [0, 30, 60])
+    assert np.array_equal(production[:, 0], [10, 20, 30])
+    assert not capsys.readouterr().out
+    with open(path, "wb") as sr3:
+        sr3.write(b"not hdf5")
+    assert sleeper.partial_production() is None
+    assert sleeper.partial_production() is None
+    assert capsys.readouterr().out.count("Early kill") == 1
+
+
+def test_run_imex_early_kill(sleeper, monkeypatch):
+    """ A run that can't beat kill_threshold is stopped with its npv
+    bound."""
+    sleeper.timeout = None
+    sleeper.monitor_interval = 0.05
+    sleeper.kill_threshold = -1e9
+    sleeper.res_param.update({"prices": [126, 19, 6, 0.1],
+                              "max_plat_prod": 100})
+    run_time = np.array([0.0, 30.0])
+    monkeypatch.setattr(sleeper, "partial_production",
+                        lambda: (run_time, np.zeros((2, 4))))
+    start = time.time()
+    sleeper.run_imex()
+    sleeper.net_present_value()
+    assert time.time() - start < 2.0
+    assert sleeper.status == "killed"
+    assert sleeper.npv == sleeper.early_bound
+    assert sleeper.npv > sleeper.kill_threshold
+    sleeper.kill_threshold = None
+    sleeper.early_bound = None
+    sleeper.timeout = 0.2
+    sleeper.run_imex()
+    assert sleeper.status == "timeout"
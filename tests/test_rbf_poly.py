@@ -0,0 +1,155 @@
+""" Tests for the RbfPoly surrogate."""
+import pytest
+import numpy as np
+from scipy.spatial import distance
+from sao_opt.doe import RandomDoE
+from sao_opt.surrogate import RbfPoly
+
+
+def sphere(input_value):
+    """ Sphere function."""
+    return np.sum(np.power(input_value, 2), axis=1)
+
+
+class CountCalls:
+
+    """Sphere function that counts the evaluated points."""
+
+    def __init__(self):
+        self.points = 0
+
+    def __call__(self, input_value):
+        self.points += len(input_value)
+        return sphere(input_value)
+
+
+@pytest.fixture(name="rbf")
+def fix_rbf():
+    """ RbfPoly with a DoE in [0, 1]^4."""
+    doe = RandomDoE(np.zeros(4), np.ones(4))
+    doe(np.zeros(4), np.ones(4), 1)
+    return RbfPoly(doe)
+
+
+def test_interpolate_samples(rbf):
+    """ The model interpolates the samples."""
+    rbf.update(sphere)
+    assert np.allclose(rbf(rbf.input_vars), rbf.output_vars)
+
+
+def test_archive(rbf):
+    """ All the samples are archived and duplicates ignored."""
+    rbf.update(sphere)
+    assert len(rbf.archive_x) == rbf.doe.num_samples
+    rbf.add_to_archive(rbf.archive_x[:2], [0, 0])
+    assert len(rbf.archive_x) == rbf.doe.num_samples
+
+
+def test_reuse_archive(rbf):
+    """ Archive points in the region need no new samples."""
+    func = CountCalls()
+    rbf.update(func)
+    assert func.points == 9
+    rbf.doe(np.zeros(4), np.full(4, 0.5), 0.5)
+    reused = len(rbf.select_archive())
+    rbf.update(func)
+    assert func.points == 9 + 9 - reused
+
+
+def test_border_equals_new_fit(rbf):
+    """ Bordering gives the same model as a new fit."""
+    rbf.update(sphere)
+    new_points = np.random.uniform(0, 1, (3, 4))
+    rbf.add_to_archive(new_points, sphere(new_points))
+    rbf.fit(rbf.select_archive())
+    assert len(rbf.system.blocks) == 1
+    test_points = np.random.uniform(0, 1, (5, 4))
+    bordered = rbf(test_points)
+    rbf.model()
+    assert np.allclose(rbf(test_points), bordered)
+    assert np.allclose(rbf(new_points), sphere(new_points))
+
+
+def test_refit_when_points_leave(rbf):
+    """ A new fit is done if model points leave the region."""
+    rbf.update(sphere)
+    rbf.doe(np.full(4, 0.8), np.ones(4), 0.2)
+    rbf.update(sphere)
+    assert not rbf.system.blocks
+    assert np.allclose(rbf(rbf.input_vars), rbf.output_vars)
+
+
+def test_gradient(rbf):
+    """ Analytic gradient is equal to finite differences."""
+    rbf.update(sphere)
+    point = np.random.uniform(0, 1, 4)
+    step = 1e-6
+    finite = [(rbf(point + step * e_i) - rbf(point - step * e_i))[0] /
+              (2 * step) for e_i in np.eye(4)]
+    assert np.allclose(rbf.gradient(point), finite, atol=1e-5)
+    assert rbf.gradient(np.vstack((point, point))).shape == (2, 4)
+
+
+def test_hessian(rbf):
+    """ Analytic hessian is equal to finite differences."""
+    rbf.update(sphere)
+    point = np.random.uniform(0, 1, 4)
+    step = 1e-6
+    finite = [(rbf.gradient(point + step * e_i) -
+               rbf.gradient(point - step * e_i)) / (2 * step)
+              for e_i in np.eye(4)]
+    assert np.allclose(rbf.hessian(point), finite, atol=1e-4)
+
+
+def test_loo_errors(rbf):
+    """ Rippa's formula equals leaving each sample out of a new fit."""
+    rbf.update(sphere)
+    points, values = rbf.input_vars, rbf.output_vars
+    errors = []
+    for index in range(len(points)):
+        keep = np.arange(len(points)) != index
+        model = RbfPoly(rbf.doe)
+        model.input_vars = points[keep]
+        model.output_vars = values[keep]
+        model.model()
+        errors.append(values[index] - model(points[[index]])[0])
+    assert np.allclose(rbf.loo_errors(), errors)
+
+
+def test_adaptive_samples(rbf):
+    """ A linear function needs only the first design, a hard one
+    uses the whole budget."""
+    func = CountCalls()
+    rbf.loo_tol = 1e-6
+    rbf.update(lambda points: func(points) * 0 + points.sum(axis=1))
+    assert func.points == 6
+    assert rbf.cv_error <= 1e-6
+    rbf.archive_x = None
+    rbf.system = None
+    rbf.model_index = []
+    func.points = 0
+    rbf.update(func)
+    assert func.points == rbf.doe.num_samples
+
+
+class KilledRuns(CountCalls):
+
+    """Sphere function whose first run of each batch is killed."""
+
+    def evaluate(self, input_value):
+        status = ["killed"] + ["ok"] * (len(input_value) - 1)
+        return self(input_value) - 100, status
+
+
+def test_killed_not_archived(rbf):
+    """ A killed DoE point has no value in the archive and it's not
+    simulated again."""
+    func = KilledRuns()
+    rbf.update(func)
+    assert func.points == 9
+    assert len(rbf.archive_y) == 8
+    assert len(rbf.killed_x) == 1
+    assert np.min(distance.cdist(rbf.killed_x, rbf.archive_x)) > 0
+    assert len(rbf.input_vars) == 8
+    rbf.update(func)
+    assert func.points == 9
@@ -107,3 +107,48 @@ def test_update_twice(results):
                                            [1, 1, 1, 1]])
     assert np.array_equal(results.delta, [0.2, 0.2])
     assert np.array_equal(results.pho, [0.5, 0.5])
+
+
+@pytest.fixture(name='results_pair')
+def fix_results_pair():
+    """ Results with a simulation that records the batches."""
+    simulation = Mock()
+    simulation.batches = []
+
+    def submit(points):
+        simulation.batches.append(points)
+        futures = []
+        for value in sphere(points):
+            future = Mock()
+            future.result.return_value = value
+            futures.append(future)
+        return futures
+
+    simulation.submit = submit
+    surrogate = Mock(side_effect=lambda points: np.array(sphere(points)))
+    results = Results(surrogate, simulation)
+    results.solver = Mock()
+    results.solver.result.x = np.array([1, 1, 1, 1])
+    results.solver.x_init = np.array([0.5, 0.5, 0.5, 0.5])
+    results.solver.infill_points.return_value = np.array([[1, 1, 1, 1]])
+    return results
+
+
+def test_fobj_list_one_batch(results_pair):
+    """ x_star and x_center are submitted in one batch."""
+    eva = results_pair.fobj_list()
+    assert len(results_pair.simulation.batches) == 1
+    assert results_pair.simulation.batches[0].shape == (2, 4)
+    assert np.allclose(eva, [4, 1, 4, 1])
+    results_pair.surrogate.add_to_archive.assert_called_once()
+
+
+def test_batch_infill(results_pair):
+    """ The best infill point is the new x_star."""
+    infill = np.array([[1, 1, 1, 1], [0.2, 0.2, 0.2, 0.2], [1, 0, 0, 0]])
+    results_pair.solver.infill_points.return_value = infill
+    eva = results_pair.fobj_list()
+    assert len(results_pair.simulation.batches) == 1
+    assert results_pair.simulation.batches[0].shape == (4, 4)
+    assert np.allclose(eva, [0.16, 1, 0.16, 1])
+    assert np.array_equal(results_pair.x_best, infill[1])
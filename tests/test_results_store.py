@@ -0,0 +1,78 @@
+""" Tests for the ResultsStore class."""
+import pytest
+import numpy as np
+from sao_opt.results import AppendResults
+from sao_opt.results_store import ResultsStore
+
+
+@pytest.fixture(name="store")
+def fix_store(tmp_path):
+    """ Store with three rows."""
+    store = ResultsStore(tmp_path / "results", mode="w")
+    for count in range(3):
+        store.append({"count": count, "fob": 0.1 * count,
+                      "x": np.full(4, count / 3)})
+    return store
+
+
+def test_memmap_readback(store, tmp_path):
+    """ The history is read back without loss of precision."""
+    other = ResultsStore(tmp_path / "results", mode="r")
+    columns = other.read()
+    assert isinstance(columns["x"], np.memmap)
+    assert columns["x"].shape == (3, 4)
+    assert np.array_equal(columns["x"][:, 0], [0, 1 / 3, 2 / 3])
+    assert np.array_equal(columns["count"], [0, 1, 2])
+    assert columns["count"].dtype.kind == "i"
+
+
+def test_append_and_new(store, tmp_path):
+    """ mode a continues the history, mode w starts a new one."""
+    store = ResultsStore(tmp_path / "results")
+    store.append({"count": 3, "fob": 0.3, "x": np.ones(4)})
+    assert len(store) == 4
+    store = ResultsStore(tmp_path / "results", mode="w")
+    assert len(store) == 0
+    assert not store.columns
+
+
+def test_partial_row_dropped(store, tmp_path):
+    """ Bytes written after the last metadata update are ignored."""
+    with open(store.column_file("x"), "ab") as file:
+        file.write(b"\0" * 8)
+    store = ResultsStore(tmp_path / "results")
+    store.append({"count": 3, "fob": 0.3, "x": np.ones(4)})
+    assert np.array_equal(store.column("x")[-1], np.ones(4))
+
+
+def test_wrong_row(store):
+    """ Rows with other columns or shapes are rejected and don't
+    shift the next rows."""
+    with pytest.raises(ValueError, match="columns"):
+        store.append({"count": 99, "fob": 9.9})
+    with pytest.raises(ValueError, match="shape"):
+        store.append({"count": 99, "fob": 9.9, "x": np.ones(5)})
+    assert len(store) == 3
+    store.append({"count": 3, "fob": 0.3, "x": np.ones(4)})
+    assert np.array_equal(store.column("count"), [0, 1, 2, 3])
+    assert np.allclose(store.column("fob"), [0, 0.1, 0.2, 0.3])
+    assert np.array_equal(store.column("x")[:, 0], [0, 1 / 3, 2 / 3, 1])
+
+
+def test_describe(tmp_path, monkeypatch):
+    """ AppendResults keeps the full x arrays in the store."""
+    monkeypatch.chdir(tmp_path)
+    results = AppendResults()
+    x_star = np.random.default_rng(0).random(36)
+    for nfev in (10, 20):
+        results.update_fobj([1.0, 2.0, 3.0, 4.0])
+        results.update_x_center(np.zeros(36))
+        results.update_x_star(x_star)
+        results.update_delta(0.5)
+        results.update_pho(1.0)
+        results.update_count()
+        results.describe(nfev)
+    store = ResultsStore("results", mode="r")
+    assert np.array_equal(store.column("x_s")[1], x_star)
+    assert np.array_equal(store.column("nfev-hf"), [10, 20])
+    assert np.array_equal(store.column("count"), [1, 2])
@@ -0,0 +1,54 @@
+""" Tests for the SaddlePointSolver."""
+import pytest
+import numpy as np
+from scipy.spatial import distance
+from sao_opt.saddle_point import SaddlePointSolver
+
+
+def rbf_blocks(samples):
+    """ Cubic kernel and linear tail blocks."""
+    phi = np.power(distance.cdist(samples, samples), 3)
+    p_matrix = np.hstack((samples, np.ones((len(samples), 1))))
+    return phi, p_matrix
+
+
+def full_matrix(phi, p_matrix):
+    """ Augmented rbf matrix."""
+    zeros = np.zeros((p_matrix.shape[1], p_matrix.shape[1]))
+    return np.block([[phi, p_matrix], [p_matrix.T, zeros]])
+
+
+@pytest.fixture(name="blocks")
+def fix_blocks():
+    """ Blocks for 30 random samples in 5 dimensions."""
+    samples = np.random.uniform(0, 1, (30, 5))
+    return rbf_blocks(samples)
+
+
+def test_solve(blocks):
+    """ Same solution of the dense solver."""
+    solver = SaddlePointSolver(*blocks)
+    rhs = np.random.uniform(0, 1, 36)
+    true = np.linalg.solve(full_matrix(*blocks), rhs)
+    assert not solver.fallback
+    assert np.allclose(solver.solve(rhs), true)
+
+
+def test_solve_many_rhs(blocks):
+    """ Solve for many right hand sides at once."""
+    solver = SaddlePointSolver(*blocks)
+    rhs = np.random.uniform(0, 1, (36, 3))
+    true = np.linalg.solve(full_matrix(*blocks), rhs)
+    assert np.allclose(solver.solve(rhs), true)
+
+
+def test_fallback_rank_deficient():
+    """ Least squares when P has not full rank."""
+    samples = np.random.uniform(0, 1, (10, 3))
+    samples[:, 2] = samples[:, 1]
+    phi, p_matrix = rbf_blocks(samples)
+    solver = SaddlePointSolver(phi, p_matrix)
+    rhs = np.hstack((np.random.uniform(0, 1, 10), np.zeros(4)))
+    assert solver.fallback
+    sol = solver.solve(rhs)
+    assert np.allclose(full_matrix(phi, p_matrix).dot(sol), rhs)
@@ -1,5 +1,6 @@
 """ Test Solver class."""
-from scipy.optimize import Bounds
+from scipy.optimize import Bounds, LinearConstraint
+from scipy.spatial import distance
 import pytest
 import numpy as np
 from sao_opt.solver import TrustConstrSolver
@@ -41,3 +42,74 @@ def test_optimize_variable(solver):
     """ Test if the solver find the optimal design variable."""
     solver.maximize_npv()
     assert np.allclose(solver.result.x, [0, 0, 0, 0, 0])
+
+
+class SphereWithGradient:
+
+    """Sphere function with analytic gradient."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, design_var):
+        self.calls += 1
+        return sphere(design_var)
+
+    @staticmethod
+    def gradient(design_var):
+        """ Gradient of the sphere function."""
+        return 2 * np.asarray(design_var)
+
+
+def test_use_analytic_gradient():
+    """ The gradient of func is given to SLSQP."""
+    solver = TrustConstrSolver()
+    solver.func = SphereWithGradient()
+    solver.x_init = np.full(10, 2.0)
+    solver.bound = [np.full(10, -5.12), np.full(10, 5.12)]
+    solver.maximize_npv()
+    assert np.allclose(solver.result.x, 0, atol=1e-6)
+    assert solver.func.calls < 2 * solver.result.nit + 5
+
+
+def rastrigin(design_var):
+    """ Rastrigin function."""
+    design_var = np.asarray(design_var)
+    return 10 * design_var.size + np.sum(
+        design_var ** 2 - 10 * np.cos(2 * np.pi * design_var))
+
+
+def test_multi_start():
+    """ Multi-start escapes the local optimum of x_init."""
+    solver = TrustConstrSolver(num_starts=16)
+    solver.func = rastrigin
+    solver.x_init = np.array([0.99, 1.99])
+    solver.bound = [np.full(2, -3), np.full(2, 3)]
+    solver.maximize_npv()
+    single = solver.minimize_from(solver.x_init)
+    assert solver.result.fun < single.fun
+    values = [res.fun for res in solver.candidates]
+    assert values == sorted(values)
+    assert len(solver.candidates) > 1
+
+
+def test_feasible():
+    """ Verify the bound and linear constraints."""
+    solver = TrustConstrSolver(LinearConstraint([[1, 1]], 0, 1))
+    solver.bound = [np.zeros(2), np.ones(2)]
+    assert solver.feasible(np.array([0.5, 0.5]))
+    assert not solver.feasible(np.array([0.8, 0.8]))
+    assert not solver.feasible(np.array([-0.1, 0.5]))
+
+
+def test_infill_points():
+    """ Infill points are distinct optima of the multi-start."""
+    solver = TrustConstrSolver(num_starts=16, num_infill=3)
+    solver.func = rastrigin
+    solver.x_init = np.array([0.99, 1.99])
+    solver.bound = [np.full(2, -3), np.full(2, 3)]
+    solver.maximize_npv()
+    points = solver.infill_points()
+    assert len(points) == 3
+    assert np.array_equal(points[0], solver.result.x)
+    assert distance.pdist(points).min() > 0.05 * np.sqrt(72)